@@ -0,0 +1,248 @@
+"""
+This module contains benchmarks of the hot paths of the library.
+
+Running them records the best time of every case in a JSON file, and
+comparing against an earlier file reports every case which got slower by more
+than a threshold, e.g.
+
+    $ python -m TL.benchmarks --output baseline.json
+    ... change something ...
+    $ python -m TL.benchmarks --output new.json --baseline baseline.json --threshold 0.1
+
+The exit status is 1 if there are regressions.
+
+The cases are:
+
+    `diagram.compose.n`, `diagram.tensor.n`
+        Products of random basis diagrams.
+
+    `tl.condense.terms`
+        Condensing an element with the given number of terms.
+
+    `tl.compose.n`
+        The product of two random elements of TL_n.
+
+    `jw.recursive.n`, `jw.single_clasp.n`
+        Calculating JW_n from scratch with each engine (see `jones_wenzl`).
+
+    `render.mode`
+        Rendering JW_4 in each mode of `renderer`.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from fractions import Fraction
+from . import cache
+from . import catalan
+from . import jones_wenzl
+from . import renderer
+from . import store
+from .jones_wenzl import JW
+from .tl import TL
+
+# The relative slowdown from which on a case counts as regression
+THRESHOLD = 0.2
+
+RENDER_MODES = {
+    "string_diagram": renderer.STRING_DIAGRAM,
+    "crossingless_matching": renderer.CROSSINGLESS_MATCHING,
+    "dyck_path": renderer.DYCK_PATH
+}
+
+
+def _random_element(n, terms, rng):
+    diagrams = [catalan.unrank(n, rng.randrange(catalan.catalan(n)), Fraction(rng.randint(-9, 9), rng.randint(1, 9)))
+                for k in range(terms)]
+
+    return TL(diagrams)
+
+
+def _diagram_cases(rng, sizes):
+    for n in sizes:
+        a, b = (catalan.unrank(n, rng.randrange(catalan.catalan(n))) for k in range(2))
+
+        yield f"diagram.compose.{n}", lambda a=a, b=b: a * b
+        yield f"diagram.tensor.{n}", lambda a=a, b=b: a & b
+
+
+def _condense_cases(rng, counts):
+    for count in counts:
+        # Half of the terms are 0
+        tl = _random_element(12, count, rng)
+        terms = {shape: (coefficient if k % 2 else 0) for k, (shape, coefficient) in enumerate(tl._terms.items())}
+        tl = TL._from_terms(tl.n, terms)
+
+        yield f"tl.condense.{count}", tl.condense_diagrams
+
+
+def _compose_cases(rng, sizes):
+    for n in sizes:
+        a, b = (_random_element(n, min(catalan.catalan(n), 64), rng) for k in range(2))
+
+        def compose(a=a, b=b):
+            # Measure the compositions, not the cache
+            cache.clear()
+
+            return a * b
+
+        yield f"tl.compose.{n}", compose
+
+
+def _jw_cases(recursive_max, single_clasp_max):
+    engines = [("recursive", jones_wenzl.RECURSIVE, recursive_max),
+               ("single_clasp", jones_wenzl.SINGLE_CLASP, single_clasp_max)]
+
+    for name, engine, n_max in engines:
+        for n in range(2, n_max + 1):
+            def calculate(n=n, engine=engine):
+                # Calculate from scratch, without the caller's projectors in
+                # memory or on disk
+                previous_engine = jones_wenzl.Engine._engine
+                previous_caches = dict(JW._caches)
+                previous_directory = store.get_directory()
+                jones_wenzl.set_engine(engine)
+                JW._caches.clear()
+                store.set_directory(None)
+                cache.clear()
+
+                try:
+                    return JW.get(n)
+                finally:
+                    jones_wenzl.set_engine(previous_engine)
+                    JW._caches.clear()
+                    JW._caches.update(previous_caches)
+                    store.set_directory(previous_directory)
+
+            yield f"jw.{name}.{n}", calculate
+
+
+def _render_cases():
+    jw = JW.get(4)
+
+    for name, mode in RENDER_MODES.items():
+        def render(mode=mode):
+            previous_mode = renderer.RenderMode._render_mode
+            renderer.set_render_mode(mode)
+
+            # Measure the drawing, not the render cache
+            renderer.clear_cache()
+
+            try:
+                return str(jw)
+            finally:
+                renderer.set_render_mode(previous_mode)
+
+        yield f"render.{name}", render
+
+
+def cases(seed=0, recursive_max=8, single_clasp_max=10):
+    """
+    All benchmark cases as pairs of a name and a function without arguments.
+    """
+
+    rng = random.Random(seed)
+
+    yield from _diagram_cases(rng, [4, 16, 64, 256])
+    yield from _condense_cases(rng, [100, 1000, 10000])
+    yield from _compose_cases(rng, [4, 6, 8])
+    yield from _jw_cases(recursive_max, single_clasp_max)
+    yield from _render_cases()
+
+
+def measure(function, repeat=3, minimum=0.05):
+    """
+    The best time of `repeat` runs of `function`, where every run repeats it
+    until `minimum` seconds have passed.
+    """
+
+    best = None
+
+    for k in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+
+        while True:
+            function()
+            calls += 1
+            seconds = time.perf_counter() - start
+
+            if seconds >= minimum:
+                break
+
+        if best is None or seconds / calls < best:
+            best = seconds / calls
+
+    return best
+
+
+def run(repeat=3, progress=None, **options):
+    """
+    Measure all cases (see `cases` for the `options`).
+
+    Returns a mapping of the names of the cases to seconds per call.
+    """
+
+    results = {}
+
+    for name, function in cases(**options):
+        results[name] = measure(function, repeat)
+
+        if progress is not None:
+            progress(name, results[name])
+
+    return results
+
+
+def save(results, path):
+    with open(path, "w") as file:
+        json.dump({"python": sys.version, "results": results}, file, indent=4, sort_keys=True)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    The cases which are slower than in `baseline` by more than `threshold`
+    (relatively), as triples of the name, the old and the new time.
+    """
+
+    return [(name, baseline[name], seconds) for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + threshold)]
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the library.")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="relative slowdown counted as regression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recursive-max", type=int, default=8, help="the biggest n of JW_n for the recursive engine")
+    parser.add_argument("--single-clasp-max", type=int, default=10, help="the biggest n of JW_n for the single clasp engine")
+    arguments = parser.parse_args(arguments)
+
+    results = run(arguments.repeat, lambda name, seconds: print(f"{name:32} {seconds:.6f}s"),
+                  recursive_max=arguments.recursive_max, single_clasp_max=arguments.single_clasp_max)
+
+    if arguments.output is not None:
+        save(results, arguments.output)
+
+    if arguments.baseline is not None:
+        regressions = compare(results, load(arguments.baseline), arguments.threshold)
+
+        for name, old, new in regressions:
+            print(f"Regression: {name}: {old:.6f}s -> {new:.6f}s")
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
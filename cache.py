@@ -0,0 +1,126 @@
+"""
+This module memoizes the compositions of basis diagrams.
+
+Working in a fixed TL_n, `TL.compose` composes the same pairs of shapes (see
+`Diagram.shape`) over and over again.
+The result of composing two shapes is a shape and a number of closed loops,
+independent of any coefficients, so it is remembered in a bounded cache which
+evicts the least recently used entries, e.g.
+
+    >>> u = TL.U(4, 0) * TL.U(4, 1)
+    >>> u * u
+    >>> u * u
+    >>> cache.stats()
+    {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 65536}
+
+Products with a single generator U_i only rewire two strings (see
+`TL.compose`), so they never go through the cache.
+"""
+
+from collections import OrderedDict
+from . import involution
+
+# The default number of remembered compositions
+MAXSIZE = 1 << 16
+
+
+class CompositionCache:
+    """
+    A least recently used cache of compositions of shapes.
+
+    `maxsize: int`
+            The maximal number of remembered compositions.
+            A cache with `maxsize == 0` remembers nothing.
+
+    `hits: int`, `misses: int`
+            How often a composition was (not) found.
+
+    `_entries: OrderedDict`
+            Maps (top, bottom) to (shape, loops), the least recently used
+            first.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+    _entries: OrderedDict
+
+    def __init__(self, maxsize=MAXSIZE):
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError(f"`maxsize` must be a non-negative integer: {maxsize}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def compose(self, top, bottom):
+        """
+        Like `involution.compose_shapes`, but remembered.
+        """
+
+        key = (top, bottom)
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+            return entry
+
+        self.misses += 1
+        entry = involution.compose_shapes(top, bottom)
+
+        if self.maxsize:
+            self._entries[key] = entry
+
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def resize(self, maxsize):
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError(f"`maxsize` must be a non-negative integer: {maxsize}")
+
+        self.maxsize = maxsize
+
+        while len(self._entries) > maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+
+
+# The cache used by `TL.compose`
+_cache = CompositionCache()
+
+
+def compose_shapes(top, bottom):
+    return _cache.compose(top, bottom)
+
+
+def set_maxsize(maxsize):
+    """
+    Bound the number of remembered compositions (0 turns the cache off).
+    """
+
+    _cache.resize(maxsize)
+
+
+def stats():
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()
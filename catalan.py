@@ -0,0 +1,175 @@
+"""
+This module numbers the basis diagrams of TL_n, i.e. the crossingless
+matchings on 2n vertices, by the integers 0, ..., Catalan(n) - 1.
+
+A matching is read as the Dyck word of `renderer.dyck_path`: vertex k is a
+"+" if it is matched with a bigger vertex and a "-" otherwise.
+The rank of a diagram is the position of its Dyck word among all Dyck words
+of length 2n in lexicographic order, where "+" comes before "-".
+So `Diagram.id(n)`, i.e. (++...+--...-), has rank 0, e.g.
+
+    >>> [renderer.dyck_path(d) for d in catalan.basis(3)]
+    ['1 * (+++---)', '1 * (++-+--)', '1 * (++--+-)', '1 * (+-++--)', '1 * (+-+-+-)']
+
+Ranking and unranking run in O(n) using a table of ballot numbers which is
+computed once for every n.
+"""
+
+from array import array
+from . import involution
+from .diagram import Diagram
+
+
+class BallotTable:
+    """
+    The number of ways to complete a prefix of a Dyck word of length 2n.
+
+    `_completions[i * (n + 2) + h]` is the number of Dyck words of length 2n
+    starting with a given prefix of length i which ends at height h.
+    """
+
+    n: int
+    _completions: list
+
+    def __init__(self, n):
+        self.n = n
+        width = n + 2
+
+        completions = [0 for k in range((2 * n + 1) * width)]
+        completions[2 * n * width] = 1
+
+        for i in range(2 * n - 1, -1, -1):
+            for h in range(min(i, 2 * n - i) + 1):
+                count = completions[(i + 1) * width + h + 1]
+
+                if h > 0:
+                    count += completions[(i + 1) * width + h - 1]
+
+                completions[i * width + h] = count
+
+        self._completions = completions
+
+    def get(self, i, h):
+        return self._completions[i * (self.n + 2) + h]
+
+
+_tables = {}
+
+
+def ballot_table(n):
+    """
+    The (cached) `BallotTable` for TL_n.
+    """
+
+    table = _tables.get(n)
+
+    if table is None:
+        table = _tables[n] = BallotTable(n)
+
+    return table
+
+
+def catalan(n):
+    """
+    The number of basis diagrams of TL_n.
+    """
+
+    return ballot_table(n).get(0, 0)
+
+
+def rank_partners(partners, n):
+    """
+    The rank of a crossingless matching given as a partner array (or a view
+    of a shape) on 2n vertices.
+    """
+
+    completions = ballot_table(n)._completions
+    width = n + 2
+
+    index = 0
+    h = 0
+
+    for i in range(2 * n):
+        if partners[i] > i:
+            h += 1
+        else:
+            # All words with a "+" here come first
+            index += completions[(i + 1) * width + h + 1]
+            h -= 1
+
+    return index
+
+
+def rank(diagram):
+    """
+    The rank of the shape of `diagram`.
+    """
+
+    return rank_partners(diagram._partners, diagram.n)
+
+
+def rank_shape(shape):
+    """
+    The rank of a shape (see `Diagram.shape`).
+    """
+
+    return rank_partners(involution.view(shape), involution.shape_size(shape))
+
+
+def unrank_partners(n, index):
+    """
+    The partner array of the crossingless matching of rank `index` on 2n
+    vertices.
+    """
+
+    table = ballot_table(n)
+
+    if not 0 <= index < table.get(0, 0):
+        raise ValueError(f"`index` must be in the range 0, ..., Catalan(n) - 1: {index}, {n}")
+
+    completions = table._completions
+    width = n + 2
+
+    partners = array(involution.TYPECODE, bytes(4 * n))
+    openers = []
+    h = 0
+
+    for i in range(2 * n):
+        below = completions[(i + 1) * width + h + 1]
+
+        if index < below:
+            openers.append(i)
+            h += 1
+        else:
+            index -= below
+            j = openers.pop()
+            partners[i] = j
+            partners[j] = i
+            h -= 1
+
+    return partners
+
+
+def unrank(n, index, coefficient=1):
+    """
+    The diagram of rank `index` in TL_n.
+    """
+
+    return Diagram._from_partners(unrank_partners(n, index), coefficient)
+
+
+def unrank_shape(n, index):
+    """
+    The shape of the diagram of rank `index` in TL_n.
+    """
+
+    return involution.to_shape(unrank_partners(n, index))
+
+
+def basis(n):
+    """
+    Lazily enumerate all basis diagrams of TL_n in rank order.
+    """
+
+    for index in range(catalan(n)):
+        yield unrank(n, index)
@@ -0,0 +1,53 @@
+from . import catalan
+
+
+def test(n = 6):
+    test_a(n)
+    print("\n\n\n")
+    test_b(n)
+
+
+def test_a(n = 6):
+    """
+    rank(unrank(n, r)) == r for all 0 <= r < Catalan(n)
+    """
+
+    print("""\
++
+| Running `test_a`:
+|
+|   rank(unrank(n, r)) = r,
+|
+| for all 0 <= r < Catalan(n).
++
+
+""")
+
+    for m in range(1, n + 1):
+        for r, diagram in enumerate(catalan.basis(m)):
+            assert catalan.rank(diagram) == r
+            assert catalan.rank_shape(diagram.shape()) == r
+
+        print(f"TL_{m}: {catalan.catalan(m)} diagrams")
+
+
+def test_b(n = 6):
+    """
+    The basis of TL_n consists of Catalan(n) different diagrams
+    """
+
+    print("""\
++
+| Running `test_b`:
+|
+|   |basis(n)| = Catalan(n),
+|
+| all different.
++
+
+""")
+
+    for m in range(1, n + 1):
+        shapes = set(diagram.shape() for diagram in catalan.basis(m))
+        print(f"TL_{m}: {len(shapes)} different diagrams")
+        assert len(shapes) == catalan.catalan(m)
@@ -0,0 +1,459 @@
+"""
+This module contains the coefficient modes, i.e. the fields in which the
+coefficients of `Diagram`s and `TL`s live.
+The supported modes are:
+
+    `EXACT`
+        This is the default mode.
+        Coefficients are `Fraction`s (or `int`s).
+
+    `FLOAT`
+        Coefficients are `float`s, stored unboxed in arrays of doubles.
+        This is meant for fast approximate runs.
+
+    `INTEGER`
+        Coefficients are `int`s, stored unboxed in arrays of 64 bit integers.
+        This is only valid as long as no fractions (e.g. in `JW.get`) or
+        overflows occur, otherwise a `ValueError` or `OverflowError` is raised.
+
+    `Modular(p)`
+        Coefficients are `ModInt`s, i.e. residues modulo the prime p.
+        See `modular` for recovering exact results from several primes, e.g.
+
+        >>> coefficients.set_mode(coefficients.Modular(1000003))
+        >>> print(JW.get(2))
+
+            0 1
+            | |
+        1 * | |
+            | |
+            3 2
+
+         +
+
+                 0 1
+                 \_/
+        500002 *  _
+                 / \
+                 3 2
+
+The mode decides which coefficients new elements (e.g. `JW.get`) are built
+with and how the coefficients of elements are stored.
+
+Every closed loop contributes a factor of the loop value delta, which is -2
+by default and can be changed with `set_loop_value`.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+from fractions import Fraction
+
+
+class ModInt:
+    """
+    A residue modulo a prime.
+
+    `value: int`
+            The residue in 0, ..., p - 1.
+
+    `p: int`
+            The prime.
+    """
+
+    __slots__ = ("value", "p")
+
+    value: int
+    p: int
+
+    def __init__(self, value, p):
+        self.p = p
+
+        if isinstance(value, ModInt):
+            if not value.p == p:
+                raise ValueError(f"`value` is a residue modulo another prime: {value.p}, {p}")
+
+            self.value = value.value
+        elif isinstance(value, int):
+            self.value = value % p
+        elif isinstance(value, Fraction):
+            if value.denominator % p == 0:
+                raise ValueError(f"The denominator of `value` is divisible by {p}: {value}")
+
+            self.value = value.numerator * pow(value.denominator, -1, p) % p
+        else:
+            raise ValueError(f"`value` must be of type `ModInt`, `Fraction` or `int`: `{type(value).__name__}`")
+
+    def _coerce(self, other):
+        # The residue of `other`, or `None` if it is no scalar
+        if isinstance(other, ModInt):
+            if not other.p == self.p:
+                raise ValueError(f"Residues modulo different primes: {self.p}, {other.p}")
+
+            return other.value
+        elif isinstance(other, int):
+            return other % self.p
+        elif isinstance(other, Fraction):
+            return ModInt(other, self.p).value
+
+        return None
+
+    def __add__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return _residue((self.value + value) % self.p, self.p)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return _residue((self.value - value) % self.p, self.p)
+
+    def __rsub__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return _residue((value - self.value) % self.p, self.p)
+
+    def __neg__(self):
+        return _residue(-self.value % self.p, self.p)
+
+    def __mul__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return _residue(self.value * value % self.p, self.p)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return _residue(self.value * pow(value, -1, self.p) % self.p, self.p)
+
+    def __rtruediv__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return _residue(value * pow(self.value, -1, self.p) % self.p, self.p)
+
+    def __pow__(self, exponent):
+        return _residue(pow(self.value, exponent, self.p), self.p)
+
+    def __eq__(self, other):
+        value = self._coerce(other)
+
+        if value is None:
+            return NotImplemented
+
+        return self.value == value
+
+    def __hash__(self):
+        return hash((self.value, self.p))
+
+    def __repr__(self):
+        return f"ModInt({self.value}, {self.p})"
+
+    def __str__(self):
+        return str(self.value)
+
+
+def _residue(value, p):
+    # A `ModInt` of a residue in 0, ..., p - 1, skipping all checks
+    residue = ModInt.__new__(ModInt)
+    residue.value = value
+    residue.p = p
+
+    return residue
+
+
+# The types a coefficient may have
+SCALARS = (Fraction, int, float, ModInt)
+
+
+class ArrayTerms(MutableMapping):
+    """
+    A mapping of shapes to coefficients (see `TL`) storing the coefficients
+    unboxed in an `array`.
+
+    `_slots: dict`
+            The position of each shape in `_shapes` and `_values`.
+
+    `_shapes: list`
+            The shapes.
+
+    `_values: array`
+            The coefficients.
+
+    `_convert`:
+            Turns a coefficient into something `_values` can store.
+    """
+
+    _slots: dict
+    _shapes: list
+    _values: array
+
+    def __init__(self, typecode, convert):
+        self._slots = {}
+        self._shapes = []
+        self._values = array(typecode)
+        self._convert = convert
+
+    def __getitem__(self, shape):
+        return self._values[self._slots[shape]]
+
+    def get(self, shape, default=None):
+        slot = self._slots.get(shape)
+
+        if slot is None:
+            return default
+
+        return self._values[slot]
+
+    def __setitem__(self, shape, value):
+        value = self._convert(value)
+        slot = self._slots.get(shape)
+
+        if slot is None:
+            self._slots[shape] = len(self._shapes)
+            self._shapes.append(shape)
+            self._values.append(value)
+        else:
+            self._values[slot] = value
+
+    def __delitem__(self, shape):
+        slot = self._slots.pop(shape)
+        last = len(self._shapes) - 1
+
+        # Move the last entry into the gap
+        if not slot == last:
+            self._shapes[slot] = self._shapes[last]
+            self._values[slot] = self._values[last]
+            self._slots[self._shapes[slot]] = slot
+
+        self._shapes.pop()
+        self._values.pop()
+
+    def __iter__(self):
+        return iter(self._shapes)
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def items(self):
+        # Lazily, so iterating the terms copies nothing
+        return zip(self._shapes, self._values)
+
+    def values(self):
+        return iter(self._values)
+
+    def rekey(self, function):
+        """
+        A copy in which every shape is replaced by `function(shape)`, which
+        must not map two shapes to the same one.
+
+        The coefficients keep their slots, so they are copied as a whole.
+        """
+
+        terms = ArrayTerms(self._values.typecode, self._convert)
+        terms._shapes = [function(shape) for shape in self._shapes]
+        terms._slots = {shape: slot for slot, shape in enumerate(terms._shapes)}
+        terms._values = array(self._values.typecode, self._values)
+
+        return terms
+
+    def copy(self):
+        terms = ArrayTerms(self._values.typecode, self._convert)
+        terms._slots = self._slots.copy()
+        terms._shapes = self._shapes.copy()
+        terms._values = array(self._values.typecode, self._values)
+
+        return terms
+
+
+class ResidueTerms(dict):
+    """
+    A mapping of shapes to coefficients (see `TL`) turning every coefficient
+    into a residue modulo the prime `p` when it is stored.
+
+    `p: int`
+            The prime.
+    """
+
+    p: int
+
+    def __init__(self, p):
+        super().__init__()
+        self.p = p
+
+    def __setitem__(self, shape, value):
+        # Residues modulo `p` are stored as they are
+        if not (type(value) is ModInt and value.p == self.p):
+            value = ModInt(value, self.p)
+
+        super().__setitem__(shape, value)
+
+    def copy(self):
+        terms = ResidueTerms(self.p)
+        dict.update(terms, self)
+
+        return terms
+
+    def rekey(self, function):
+        """
+        A copy in which every shape is replaced by `function(shape)`, which
+        must not map two shapes to the same one.
+        """
+
+        terms = ResidueTerms(self.p)
+        dict.update(terms, ((function(shape), value) for shape, value in self.items()))
+
+        return terms
+
+
+class Exact:
+    """
+    Coefficients are `Fraction`s (or `int`s).
+    """
+
+    key = "exact"
+
+    def convert(self, value):
+        if isinstance(value, int):
+            return value
+
+        return Fraction(value)
+
+    def terms(self):
+        return {}
+
+
+class Float:
+    """
+    Coefficients are `float`s, stored unboxed.
+    """
+
+    key = "float"
+
+    def convert(self, value):
+        return float(value)
+
+    def terms(self):
+        return ArrayTerms("d", float)
+
+
+class Integer:
+    """
+    Coefficients are `int`s, stored unboxed.
+    """
+
+    key = "integer"
+
+    def convert(self, value):
+        if isinstance(value, int):
+            return value
+
+        if not value == int(value):
+            raise ValueError(f"The integer coefficient mode can not represent `{value}`")
+
+        return int(value)
+
+    def terms(self):
+        return ArrayTerms("q", self.convert)
+
+
+class Modular:
+    """
+    Coefficients are residues modulo the prime `p`.
+    """
+
+    p: int
+
+    def __init__(self, p):
+        self.p = p
+        self.key = f"mod {p}"
+
+    def convert(self, value):
+        return ModInt(value, self.p)
+
+    def terms(self):
+        return ResidueTerms(self.p)
+
+
+EXACT = Exact()
+FLOAT = Float()
+INTEGER = Integer()
+
+
+def from_key(key):
+    """
+    The coefficient mode with the given `key`, e.g. "mod 1000003".
+    """
+
+    for mode in [EXACT, FLOAT, INTEGER]:
+        if mode.key == key:
+            return mode
+
+    if key.startswith("mod "):
+        return Modular(int(key[4:]))
+
+    raise ValueError(f"There is no coefficient mode with the key `{key}`")
+
+
+class CoefficientMode:
+    # The default coefficient mode
+    _mode = EXACT
+
+    # The default loop value
+    _loop_value = -2
+
+    # The loop value converted into the coefficient mode
+    _delta = -2
+
+
+def set_mode(mode):
+    # Convert first, so a mode which can not represent the loop value is not
+    # set at all
+    delta = mode.convert(CoefficientMode._loop_value)
+
+    CoefficientMode._mode = mode
+    CoefficientMode._delta = delta
+
+
+def get_mode():
+    return CoefficientMode._mode
+
+
+def set_loop_value(loop_value):
+    if not isinstance(loop_value, SCALARS):
+        raise ValueError(f"`loop_value` must be of type `Fraction`, `int` or `float`: `{type(loop_value).__name__}`")
+
+    CoefficientMode._delta = CoefficientMode._mode.convert(loop_value)
+    CoefficientMode._loop_value = loop_value
+
+
+def get_loop_value():
+    return CoefficientMode._loop_value
+
+
+def delta():
+    """
+    The factor of a closed loop in the current coefficient mode.
+    """
+
+    return CoefficientMode._delta
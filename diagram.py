@@ -1,6 +1,10 @@
+from array import array
 from fractions import Fraction
-import logging
+from . import coefficients
+from . import dyck
+from . import involution
 from . import renderer
+from . import words
 
 
 class Diagram:
@@ -28,15 +32,17 @@ class Diagram:
     `n: int`
             The integer n in 'crossingles matching on 2n vertices'.
 
-    `_connections: list`
-            A list of tuples (a, b) where a < b is a match.
+    `_partners: array`
+            The partner array of the matching, i.e. `_partners[a] == b` and
+            `_partners[b] == a` for every match (a, b).
+            See `involution` for details.
 
     `_coefficient: Fraction`
             A Fraction
     """
 
     n: int
-    _connections: list
+    _partners: array
     _coefficient: Fraction
 
     def __init__(self, connections: list = [(0, 1)], coefficient:Fraction = Fraction(1, 1)):
@@ -47,13 +53,93 @@ class Diagram:
             not all(len(match) == 2 for match in connections)):
             raise ValueError(f"`connections` must be a non-empty list of two element tuples: {connections}")
 
-        if not (isinstance(coefficient, Fraction) or isinstance(coefficient, int)):
-            raise ValueError(f"`coefficient` must be of type `Fraction` or `int`: `{type(coefficient).__name__}`")
+        if not isinstance(coefficient, coefficients.SCALARS):
+            raise ValueError(f"`coefficient` must be of type `Fraction`, `int`, `float` or `ModInt`: `{type(coefficient).__name__}`")
 
         self.n = len(connections)
-        self._connections = connections
+        self._partners = involution.from_connections(connections)
         self._coefficient = coefficient
 
+    def _from_partners(partners, coefficient):
+        """
+        Build a diagram straight from a partner array, skipping all checks.
+        """
+
+        diagram = Diagram.__new__(Diagram)
+        diagram.n = len(partners) // 2
+        diagram._partners = partners
+        diagram._coefficient = coefficient
+
+        return diagram
+
+    def _from_shape(shape, coefficient):
+        """
+        Build a diagram from a shape (see `shape`), skipping all checks.
+        """
+
+        return Diagram._from_partners(involution.from_shape(shape), coefficient)
+
+    def shape(self):
+        """
+        The coefficient free, hashable and canonical key of the matching.
+
+        Two diagrams have the same shape if and only if they are the same
+        crossingless matching.
+        """
+
+        return involution.to_shape(self._partners)
+
+    def from_dyck(n, word, coefficient=Fraction(1, 1)):
+        """
+        The diagram on 2n vertices with the Dyck word `word` (see `dyck`).
+        """
+
+        if not isinstance(coefficient, coefficients.SCALARS):
+            raise ValueError(f"`coefficient` must be of type `Fraction`, `int`, `float` or `ModInt`: `{type(coefficient).__name__}`")
+
+        return Diagram._from_partners(dyck.to_partners(word, n), coefficient)
+
+    def to_dyck(self):
+        """
+        The Dyck word of the matching (see `dyck`).
+        """
+
+        return dyck.from_partners(self._partners)
+
+    def from_word(n, word, coefficient=Fraction(1, 1)):
+        """
+        The product of the generators U_i of TL_n for the letters i of `word`
+        (see `words`), i.e. `coefficient` times a power of the loop value
+        times a basis diagram.
+        """
+
+        if not isinstance(coefficient, coefficients.SCALARS):
+            raise ValueError(f"`coefficient` must be of type `Fraction`, `int`, `float` or `ModInt`: `{type(coefficient).__name__}`")
+
+        shape, loops = words.from_word(n, word)
+        delta = coefficients.delta()
+
+        for i in range(loops):
+            coefficient *= delta
+
+        return Diagram._from_shape(shape, coefficient)
+
+    def to_reduced_word(self):
+        """
+        The Jones normal form of the matching (see `words`), i.e. a shortest
+        word in the generators U_i whose product is the matching.
+        """
+
+        return words.reduced_word(self.shape())
+
+    @property
+    def _connections(self):
+        """
+        A list of tuples (a, b) where a < b is a match.
+        """
+
+        return involution.to_connections(self._partners)
+
     def id(n):
         return Diagram(connections=[(a, 2 * n - a - 1) for a in range(n)])
 
@@ -78,185 +164,98 @@ class Diagram:
         return Diagram(connections)
 
     def get_match(self, k):
-        for match in self._connections:
-            if match[0] == k:
-                return match[1]
-            elif match[1] == k:
-                return match[0]
+        return self._partners[k]
 
     def compose(self, diagram):
         """
         This takes `self` and stacks it on top of `diagram`.
         """
 
+        partners, loops = involution.compose(self._partners, diagram._partners, self.n)
+
         coefficient = self._coefficient * diagram._coefficient
-        connections = []
+        delta = coefficients.delta()
 
-        # All indices from the perspective of `self`
-        todo_top = list(range(self.n))
-        todo_bottom = list(range(self.n, 2 * self.n))
-        todo_middle = list(range(self.n, 2 * self.n))
-
-        logging.info("todo_top:")
-        logging.info(todo_top)
-        logging.info("todo_bottom:")
-        logging.info(todo_bottom)
-        logging.info("todo_middle:")
-        logging.info(todo_middle)
-
-        # Run all string from the top
-        while todo_top:
-            i = todo_top.pop(0)
-            logging.info(f"todo_top - {i}:")
-            logging.info(todo_top)
-
-            # Run through the combinded diagram until an end is reached
-            apply_self = True
-            j = i
-            while True:
-                if apply_self:
-                    j = self.get_match(j)
-
-                    # `self` leads back up
-                    if j < self.n:
-                        logging.info(f"todo_top - {j}:")
-                        todo_top.remove(j)
-                        logging.info(todo_top)
-                        connections.append((i, j))
-                        logging.info(connections)
-                        logging.info("")
-                        break
-                    # `self` leads to the middle
-                    else:
-                        logging.info(f"todo_middle - {j}:")
-                        todo_middle.remove(j)
-                        logging.info(todo_middle)
-                        apply_self = False
-                else:
-                    j = 2 * self.n - j - 1  # Re-indexing
-                    j = diagram.get_match(j)
-
-                    # `diagram` leads down
-                    if j >= self.n:
-                        logging.info(f"todo_bottom - {j}:")
-                        todo_bottom.remove(j)
-                        logging.info(todo_bottom)
-                        connections.append((i, j))
-                        logging.info(connections)
-                        logging.info("")
-                        break
-                    # `diagram` leads back to the middle
-                    else:
-                        j = 2 * self.n - j - 1  # Re-indexing
-                        logging.info(f"todo_middle - {j}:")
-                        todo_middle.remove(j)
-                        logging.info(todo_middle)
-                        apply_self = True
-
-        # Run all string from the bottom
-        while todo_bottom:
-            i = todo_bottom.pop(0)
-            logging.info(f"todo_bottom - {i}:")
-            logging.info(todo_bottom)
-
-            # Run through the combinded diagram until an end is reached
-            apply_self = False
-            j = i
-            while True:
-                if not apply_self:
-                    j = diagram.get_match(j)
-
-                    # `diagram` leads back dowm
-                    if j >= self.n:
-                        logging.info(f"todo_bottom - {j}:")
-                        todo_bottom.remove(j)
-                        logging.info(todo_bottom)
-                        connections.append((i, j))
-                        logging.info(connections)
-                        logging.info("")
-                        break
-                    # `diagram` leads to the middle
-                    else:
-                        j = 2 * self.n - j - 1  # Re-indexing
-                        logging.info(f"todo_middle - {j}:")
-                        todo_middle.remove(j)
-                        logging.info(todo_middle)
-                        apply_self = True
-                else:
-                    j = self.get_match(j)
-
-                    # `self` leads up
-                    if j < self.n:
-                        assert False  # This can not happen because we already ran top down
-                        logging.info(f"todo_top - {j}:")
-                        todo_top.remove(j)
-                        logging.info(todo_top)
-                        connections.append((i, j))
-                        logging.info(connections)
-                        logging.info("")
-                        break
-                    # `self` leads back to the middle
-                    else:
-                        logging.info(f"todo_middle - {j}:")
-                        todo_middle.remove(j)
-                        logging.info(todo_middle)
-                        apply_self = False
-                        j = 2 * self.n - j - 1  # Re-indexing
-
-        assert len(todo_middle) % 2 == 0
-
-        for i in range(len(todo_middle) // 2):
-            coefficient *= -2
-
-        return Diagram(connections, coefficient)
+        for i in range(loops):
+            coefficient *= delta
 
-    def tensor(self, other):
+        return Diagram._from_partners(partners, coefficient)
+
+    def compose_chain(diagrams):
         """
-        This takes `self` and puts it to the left of `other`.
+        Stack all `diagrams` on top of each other, the first at the top.
+
+        Unlike composing them one by one, this resolves all strings and closed
+        loops of the whole stack in a single pass (see
+        `involution.compose_chain`), without intermediate diagrams.
         """
 
-        other_offset = self.n
-        self_right_half_offset = 2 * other.n
+        diagrams = list(diagrams)
 
-        connections = []
+        # Some idiot testing
+        if (not diagrams or
+            not all(isinstance(diagram, Diagram) for diagram in diagrams) or
+            not all(diagram.n == diagrams[0].n for diagram in diagrams)):
+            raise ValueError(f"`diagrams` must be a non-empty list of diagrams for the same n: {diagrams}")
 
-        for match in self._connections:
-            i, j = match
+        partners, loops = involution.compose_chain([diagram._partners for diagram in diagrams], diagrams[0].n)
 
-            if i >= self.n:
-                i += self_right_half_offset
+        coefficient = diagrams[0]._coefficient
+        delta = coefficients.delta()
 
-            if j >= self.n:
-                j += self_right_half_offset
+        for diagram in diagrams[1:]:
+            coefficient *= diagram._coefficient
 
-            connections.append((i, j))
+        for i in range(loops):
+            coefficient *= delta
 
-        for match in other._connections:
-            i, j = match
+        return Diagram._from_partners(partners, coefficient)
 
-            connections.append((i + other_offset, j + other_offset))
+    def trace(self):
+        """
+        The Markov trace, i.e. the coefficient times the loop value to the
+        number of loops after closing all strands around the right side.
+        """
 
-        return Diagram(connections, self._coefficient * other._coefficient)
+        coefficient = self._coefficient
+        delta = coefficients.delta()
 
-    def _has_same_diagram_as(self, other, check_coefficient=False):
-        if not self.n == other.n:
-            return False
+        for i in range(involution.trace(self._partners, self.n)):
+            coefficient *= delta
 
-        # Compare the matches
-        for match in self._connections:
-            # assert isinstance(match, tuple)
-            # assert len(str(match)) < 7
-            # if str(match).startswith("\n"):
-            #     assert False
-            if match in other._connections:
-                continue
-            elif (match[1], match[0]) in other._connections:
-                continue
-            else:
-                logging.info(f"{repr(self)} is not euqal to {repr(other)} because of {match} in {repr(self)}")
-                return False
+        return coefficient
 
-        return True
+    def partial_trace(self, k):
+        """
+        Close the k rightmost strands around the right side, giving a diagram
+        on 2(n - k) vertices.
+        """
+
+        # Some idiot testing
+        if not isinstance(k, int) or not 0 <= k < self.n:
+            raise ValueError(f"`k` must be an integer with 0 <= k < `n` to leave strands open in TL_n: {k}, {self.n}")
+
+        partners, loops = involution.partial_trace(self._partners, self.n, k)
+
+        coefficient = self._coefficient
+        delta = coefficients.delta()
+
+        for i in range(loops):
+            coefficient *= delta
+
+        return Diagram._from_partners(partners, coefficient)
+
+    def tensor(self, other):
+        """
+        This takes `self` and puts it to the left of `other`.
+        """
+
+        partners = involution.tensor(self._partners, other._partners, self.n, other.n)
+
+        return Diagram._from_partners(partners, self._coefficient * other._coefficient)
+
+    def _has_same_diagram_as(self, other, check_coefficient=False):
+        return self.shape() == other.shape()
 
     def __eq__(self, other):
         # If there is a check against 0
@@ -271,6 +270,10 @@ class Diagram:
         # Compare the actual diagrams
         return self._has_same_diagram_as(other, check_coefficient=True)
 
+    def __hash__(self):
+        # Equal diagrams have the same shape
+        return hash(self.shape())
+
     def __and__(self, other):
         return self.tensor(other)
 
@@ -285,9 +288,9 @@ class Diagram:
         # other * Diagram
         # and other is not Diagram (because __mul__ wans't called)
         # => other is scalar
-        if isinstance(other, Fraction):
-            return Diagram(connections=self._connections,
-                           coefficient=other * self._coefficient)
+        if (isinstance(other, Fraction) or isinstance(other, float) or
+            isinstance(other, coefficients.ModInt)):
+            return Diagram._from_partners(self._partners, other * self._coefficient)
         elif isinstance(other, int):
             return Fraction(other) * self
 
@@ -296,7 +299,7 @@ class Diagram:
         # => other is Diagram
         assert self._has_same_diagram_as(other)
 
-        return Diagram(self._connections, self._coefficient + other._coefficient)
+        return Diagram._from_partners(self._partners, self._coefficient + other._coefficient)
 
     def __radd__(self, other):
         # other + Diagram
@@ -1,4 +1,9 @@
+from fractions import Fraction
+from . import catalan
+from . import coefficients
+from . import renderer
 from .diagram import Diagram
+from .dyck_diagram import DyckDiagram
 
 
 def test(n = 3):
@@ -7,6 +12,14 @@ def test(n = 3):
     test_b(n)
     print("\n\n\n")
     test_c(n)
+    print("\n\n\n")
+    test_d(n)
+    print("\n\n\n")
+    test_e(n)
+    print("\n\n\n")
+    test_f(n)
+    print("\n\n\n")
+    test_g(n)
 
 
 def test_a(n = 4):
@@ -109,3 +122,162 @@ def test_c(n = 4):
                 assert a == b
             else:
                 continue
+
+
+def test_d(n = 4):
+    """
+    For delta == -2:
+    U_i * U_{i-1} * U_{i+1} * U_i * U_{i-1} * U_{i+1} == delta * U_i * U_{i-1} * U_{i+1}
+
+    Stacking U_i * U_{i-1} * U_{i+1} * U_i on top of U_{i-1} * U_{i+1} closes
+    a single loop passing four vertices in the middle.
+    """
+
+    print("""\
++
+| Running `test_d`:
+|
+|   U_i * U_{i-1} * U_{i+1} * U_i * U_{i-1} * U_{i+1} = delta U_i * U_{i-1} * U_{i+1},
+|
+| where delta = -2
++
+
+""")
+
+    U = [Diagram.U(n, i) for i in range(n - 1)]
+
+    for i in range(1, n - 2):
+        u = U[i] * U[i - 1] * U[i + 1]
+        a, b = (u * U[i]) * (U[i - 1] * U[i + 1]), -2 * u
+        print(f"U_{i} * U_{{{i}-1}} * U_{{{i}+1}} * U_{i} * U_{{{i}-1}} * U_{{{i}+1}}:")
+        print(a)
+        print(f"-2 * U_{i} * U_{{{i}-1}} * U_{{{i}+1}}:")
+        print(b)
+        print()
+        assert a == b
+
+
+def test_e(n = 4):
+    """
+    Composing and tensoring Dyck words gives the Dyck words of the composed
+    and tensored diagrams
+    """
+
+    print("""\
++
+| Running `test_e`:
+|
+|   dyck(a) * dyck(b) = dyck(a * b), dyck(a) & dyck(b) = dyck(a & b)
+|
+| for all basis diagrams a, b of TL_n
++
+
+""")
+
+    basis = list(catalan.basis(n))
+
+    for a in basis:
+        assert Diagram.from_dyck(n, a.to_dyck()) == a
+
+        for b in basis:
+            product = DyckDiagram.from_diagram(a) * DyckDiagram.from_diagram(-2 * b)
+            assert product == DyckDiagram.from_diagram(a * (-2 * b))
+            assert product.to_diagram() == a * (-2 * b)
+
+            tensor = DyckDiagram.from_diagram(a) & DyckDiagram.from_diagram(b)
+            assert tensor == DyckDiagram.from_diagram(a & b)
+
+    print(f"{len(basis)}^2 products and tensor products agree")
+
+
+def test_f(n = 4):
+    """
+    Rendering from the render cache gives the same strings as drawing every
+    diagram from scratch, and changing the render mode invalidates the cache
+    """
+
+    print("""\
++
+| Running `test_f`:
+|
+|   render(c * d) (cached) = render(c * d) (drawn)
+|
+| for all basis diagrams d of TL_n, c = 1, -22/7 and all render modes
++
+
+""")
+
+    basis = list(catalan.basis(n))
+    scaled = [Fraction(-22, 7) * d for d in basis]
+
+    draw = {
+        renderer.STRING_DIAGRAM: renderer.string_diagram,
+        renderer.CROSSINGLESS_MATCHING: renderer.corssingless_matching,
+        renderer.DYCK_PATH: renderer.dyck_path
+    }
+
+    try:
+        for mode, function in draw.items():
+            renderer.set_render_mode(mode)
+            renderer.clear_cache()
+
+            strings = renderer.render_batch(basis + scaled)
+            print(strings[-1])
+
+            assert renderer.cache_stats()["hits"] == len(basis)
+            assert strings == ["\n" + function(d) + "\n" for d in basis + scaled]
+    finally:
+        renderer.set_render_mode(renderer.STRING_DIAGRAM)
+
+    assert renderer.cache_stats()["size"] == 0
+
+
+def test_g(n = 4):
+    """
+    Words in the generators give the same diagrams as products of `Diagram.U`,
+    and the reduced words of all basis diagrams give them back
+    """
+
+    print("""\
++
+| Running `test_g`:
+|
+|   from_word(n, w) = U_{w_1} * ... * U_{w_k}
+|   from_word(n, d.to_reduced_word()) = d
+|
+| for some words w and all basis diagrams d of TL_n
++
+
+""")
+
+    delta = coefficients.delta()
+
+    for word in [(0, 0), (1, 0, 1), (0, 1, 0, 2, 1, 0), tuple(range(n - 1)) * 2]:
+        word = tuple(i % (n - 1) for i in word)
+        product = Diagram.id(n)
+
+        for i in word:
+            product = product * Diagram.U(n, i)
+
+        d = Diagram.from_word(n, word)
+        print(word, d)
+
+        assert d == product
+
+    assert Diagram.from_word(n, (0, 0)) == delta * Diagram.U(n, 0)
+
+    for d in catalan.basis(n):
+        word = d.to_reduced_word()
+
+        assert Diagram.from_word(n, word) == d
+
+        # The normal form is made of descending runs with increasing ends
+        blocks = []
+
+        for i in word:
+            if blocks and i == blocks[-1][-1] - 1:
+                blocks[-1].append(i)
+            else:
+                blocks.append([i])
+
+        assert all(a[0] < b[0] and a[-1] < b[-1] for a, b in zip(blocks, blocks[1:]))
@@ -0,0 +1,92 @@
+"""
+This module contains a driver for long runs of the recursion of the
+Jones-Wenzl projectors (see `JW`).
+
+After every level the projector is written to a checkpoint directory (in the
+format of `store`), and a later run in the same directory continues from the
+biggest level found there, e.g.
+
+    >>> def report(n, terms, seconds):
+    ...     print(f"JW_{n}: {terms} terms in {seconds:.1f}s")
+    >>> driver.run(12, "checkpoints", progress=report, workers=os.cpu_count())
+
+With `workers`, the products of every step are composed on a process pool
+(see `parallel`).
+"""
+
+import os
+import time
+from . import parallel
+from . import store
+from .jones_wenzl import JW
+
+
+def resume(n, directory):
+    """
+    The biggest m <= n for which JW_m is in memory or in `directory`, and
+    JW_m.
+
+    A projector found in memory only is written to `directory` as well.
+    """
+
+    cache = JW._get_cache()
+
+    for m in range(n, 1, -1):
+        jw = store.load(m, directory)
+
+        if jw is not None:
+            cache.setdefault(m, jw)
+
+            return m, jw
+
+        jw = cache.get(m)
+
+        if jw is not None:
+            store.save(m, jw, directory)
+
+            return m, jw
+
+    return 1, cache[1]
+
+
+def run(n, directory, progress=None, workers=0):
+    """
+    Calculate JW_n by the recursion, continuing from the checkpoints in
+    `directory` and writing a checkpoint after every level.
+
+    `progress` is called with the level, its number of terms and the seconds
+    it took after every calculated level.
+    `workers` is the number of processes composing the products (see
+    `parallel`), or 0 to keep the current setting.
+    """
+
+    # Some idiot testing
+    if not isinstance(n, int) or n < 1:
+        raise ValueError(f"`n` must be a positive integer: {n}")
+
+    os.makedirs(directory, exist_ok=True)
+
+    cache = JW._get_cache()
+    m, jw = resume(n, directory)
+
+    previous_workers = parallel.get_workers()
+
+    if workers:
+        parallel.set_workers(workers)
+
+    try:
+        for k in range(m + 1, n + 1):
+            start = time.perf_counter()
+            jw = JW._calculate_step(jw, k)
+            seconds = time.perf_counter() - start
+
+            store.save(k, jw, directory)
+            cache[k] = jw
+
+            if progress is not None:
+                progress(k, len(jw._terms), seconds)
+    finally:
+        if workers:
+            parallel.set_workers(previous_workers)
+
+    return jw
@@ -0,0 +1,222 @@
+"""
+This module contains the Dyck word engine behind `DyckDiagram` and the Dyck
+shapes of `involution`.
+
+Going around the 2n vertices of a crossingless matching in the order of their
+numbers (see `Diagram`), every match is opened at its smaller and closed at
+its bigger vertex.
+Writing 1 for opening and 0 for closing vertices gives a Dyck word, which
+determines the matching, e.g. for `Diagram.U(3, 0)`:
+
+    0 1 2
+    \_/ |
+        |
+     _  |
+    / \ |
+    5 4 3
+
+    partners == array("H", [1, 0, 3, 2, 5, 4])
+    word == 0b010101
+
+Bit k of the word (counted from the least significant bit) belongs to vertex
+k.
+Words are plain `int`s, so they are hashable and sortable for free.
+
+Both `compose` and `tensor` work on the bits themselves, without partner
+arrays: `tensor` splices the words, `compose` peels the caps at the bottom of
+the upper matching off the word of the lower one (see `_join`).
+
+A word does not know its n, because the last vertex always closes.
+Packing it with a leading 1 (see `pack`) makes it a shape of its own, which
+`involution` uses for storing diagrams as single `int`s.
+"""
+
+from array import array
+
+# The typecode of partner arrays (see `involution.TYPECODE`)
+PARTNER_TYPECODE = "H"
+
+
+def from_partners(partners):
+    """
+    The Dyck word of a partner array.
+    """
+
+    word = 0
+
+    for k, partner in enumerate(partners):
+        if partner > k:
+            word |= 1 << k
+
+    return word
+
+
+def to_partners(word, n):
+    """
+    The partner array of a Dyck word on 2n vertices.
+
+    Raises a `ValueError` if `word` is no Dyck word of length 2n.
+    """
+
+    partners = array(PARTNER_TYPECODE, bytes(4 * n))
+    openers = []
+
+    for k in range(2 * n):
+        if word >> k & 1:
+            openers.append(k)
+        elif not openers:
+            raise ValueError(f"`word` must be a Dyck word of length {2 * n}: {bin(word)}")
+        else:
+            opener = openers.pop()
+            partners[opener] = k
+            partners[k] = opener
+
+    if openers or word >> 2 * n:
+        raise ValueError(f"`word` must be a Dyck word of length {2 * n}: {bin(word)}")
+
+    return partners
+
+
+def pack(word, n):
+    """
+    The word with a leading 1 above its 2n bits, so n can be read off.
+    """
+
+    return word | 1 << 2 * n
+
+
+def unpack(packed):
+    """
+    The word and the n of a packed word (see `pack`).
+    """
+
+    n = (packed.bit_length() - 1) >> 1
+
+    return packed ^ 1 << 2 * n, n
+
+
+def _delete(word, p):
+    # Remove the bits p and p + 1, moving all higher bits down by two
+    return word & ((1 << p) - 1) | word >> (p + 2) << p
+
+
+def _join(word, p):
+    """
+    Join the vertices p and p + 1 of the matching with the Dyck word `word` by
+    a cap from outside, and remove them.
+
+    Returns the word of the remaining matching (two vertices less) and
+    whether a loop was closed.
+    """
+
+    x = word >> p & 1
+    y = word >> (p + 1) & 1
+
+    if x and not y:
+        # p and p + 1 are matched already, so they close a loop
+        return _delete(word, p), 1
+
+    if x and y:
+        # Both open: the partner of p + 1 (which is nested inside the one of
+        # p) now opens towards the partner of p
+        depth = 0
+        k = p + 2
+
+        while True:
+            if word >> k & 1:
+                depth += 1
+            elif depth:
+                depth -= 1
+            else:
+                break
+
+            k += 1
+
+        word |= 1 << k
+    elif not x and not y:
+        # Both close: the partner of p (which is nested inside the one of
+        # p + 1) now closes towards the partner of p + 1
+        depth = 0
+        k = p - 1
+
+        while True:
+            if not word >> k & 1:
+                depth += 1
+            elif depth:
+                depth -= 1
+            else:
+                break
+
+            k -= 1
+
+        word &= ~(1 << k)
+
+    # Otherwise p closes and p + 1 opens, and their partners just match each
+    # other once both are removed
+    return _delete(word, p), 0
+
+
+def compose(top, bottom, n):
+    """
+    Stack the matching with the Dyck word `top` on top of the one with the Dyck
+    word `bottom`.
+
+    Returns the Dyck word of the result and the number of closed loops.
+
+    The caps at the bottom of `top` are joined into `bottom` innermost first
+    (see `_join`), then the strings through `top` are attached to whatever is
+    left at the top of `bottom`.
+    """
+
+    last = 2 * n - 1
+    word = bottom
+    loops = 0
+    removed = 0
+
+    # The positions (in `word`) of the left ends of the open caps at the
+    # bottom of `top` and of its strings going up
+    lefts = []
+
+    for c in range(n):
+        # The bottom vertex of `top` in column c closes a cap if it opens in
+        # the order of the vertices
+        if top >> (last - c) & 1:
+            word, closed = _join(word, lefts.pop())
+            loops += closed
+            removed += 2
+        else:
+            lefts.append(c - removed)
+
+    # The strings through `top` start at the top vertices which open and are
+    # not closed at the top, in the same order as they reach the top of what
+    # is left of `bottom`
+    openers = []
+
+    for k in range(n):
+        if top >> k & 1:
+            openers.append(k)
+        else:
+            openers.pop()
+
+    result = top & ((1 << n) - 1)
+
+    for j, k in enumerate(openers):
+        if not word >> j & 1:
+            result &= ~(1 << k)
+
+    return result | word >> (n - removed) << n, loops
+
+
+def tensor(left, right, n_left, n_right):
+    """
+    Put the matching with the Dyck word `left` (on 2 * n_left vertices) to
+    the left of the one with the Dyck word `right`.
+
+    Going around the result passes the top of `left`, all of `right` and the
+    bottom of `left`, so this only splices bits.
+    """
+
+    top = left & ((1 << n_left) - 1)
+    bottom = left >> n_left
+
+    return top | right << n_left | bottom << (n_left + 2 * n_right)
@@ -0,0 +1,139 @@
+from fractions import Fraction
+from . import coefficients
+from . import dyck
+from . import involution
+from .diagram import Diagram
+
+
+class DyckDiagram:
+    """
+    A single crossingles matching with coefficient, packed into its Dyck word
+    (see `dyck`).
+
+    This is a compact alternative to `Diagram`, e.g. for holding many
+    diagrams at once: the matching is a single `int` instead of an array.
+    Products are worked out on the bits of the words (see `dyck.compose`).
+
+    `n: int`
+            The integer n in 'crossingles matching on 2n vertices'.
+
+    `word: int`
+            The Dyck word of the matching.
+
+    `_coefficient: Fraction`
+            A Fraction
+    """
+
+    __slots__ = ("n", "word", "_coefficient")
+
+    n: int
+    word: int
+    _coefficient: Fraction
+
+    def __init__(self, n, word, coefficient=Fraction(1, 1)):
+        # Some idiot testing
+        if not isinstance(coefficient, coefficients.SCALARS):
+            raise ValueError(f"`coefficient` must be of type `Fraction`, `int`, `float` or `ModInt`: `{type(coefficient).__name__}`")
+
+        # Raises if `word` is no Dyck word
+        dyck.to_partners(word, n)
+
+        self.n = n
+        self.word = word
+        self._coefficient = coefficient
+
+    def _from_dyck(n, word, coefficient):
+        """
+        Build a diagram straight from a Dyck word, skipping all checks.
+        """
+
+        diagram = DyckDiagram.__new__(DyckDiagram)
+        diagram.n = n
+        diagram.word = word
+        diagram._coefficient = coefficient
+
+        return diagram
+
+    def from_diagram(diagram):
+        return DyckDiagram._from_dyck(diagram.n, diagram.to_dyck(), diagram._coefficient)
+
+    def to_diagram(self):
+        return Diagram._from_partners(dyck.to_partners(self.word, self.n), self._coefficient)
+
+    def from_connections(connections, coefficient=Fraction(1, 1)):
+        return DyckDiagram.from_diagram(Diagram(connections, coefficient))
+
+    @property
+    def _connections(self):
+        """
+        A list of tuples (a, b) where a < b is a match.
+        """
+
+        return involution.to_connections(dyck.to_partners(self.word, self.n))
+
+    def compose(self, diagram):
+        """
+        This takes `self` and stacks it on top of `diagram`.
+        """
+
+        word, loops = dyck.compose(self.word, diagram.word, self.n)
+
+        coefficient = self._coefficient * diagram._coefficient
+        delta = coefficients.delta()
+
+        for i in range(loops):
+            coefficient *= delta
+
+        return DyckDiagram._from_dyck(self.n, word, coefficient)
+
+    def tensor(self, other):
+        """
+        This takes `self` and puts it to the left of `other`.
+        """
+
+        word = dyck.tensor(self.word, other.word, self.n, other.n)
+
+        return DyckDiagram._from_dyck(self.n + other.n, word, self._coefficient * other._coefficient)
+
+    def __eq__(self, other):
+        # If there is a check against 0
+        if (isinstance(other, int) or isinstance(other, Fraction) and
+            other == 0):
+            return self._coefficient == 0
+
+        return (self.n == other.n and
+                self.word == other.word and
+                self._coefficient == other._coefficient)
+
+    def __hash__(self):
+        # Equal diagrams have the same word
+        return hash((self.n, self.word))
+
+    def __lt__(self, other):
+        return (self.n, self.word) < (other.n, other.word)
+
+    def __and__(self, other):
+        return self.tensor(other)
+
+    __matmul__ = __and__
+
+    def __mul__(self, other):
+        # DyckDiagram * other
+        # => other is DyckDiagram
+        return self.compose(other)
+
+    def __rmul__(self, other):
+        # other * DyckDiagram
+        # and other is not DyckDiagram (because __mul__ wans't called)
+        # => other is scalar
+        if (isinstance(other, Fraction) or isinstance(other, float) or
+            isinstance(other, coefficients.ModInt)):
+            return DyckDiagram._from_dyck(self.n, self.word, other * self._coefficient)
+        elif isinstance(other, int):
+            return Fraction(other) * self
+
+    def __repr__(self):
+        return f"{self._coefficient} * {self._connections}"
+
+    def __str__(self):
+        return str(self.to_diagram())
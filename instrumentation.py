@@ -0,0 +1,228 @@
+"""
+This module counts (and optionally times) what the hot paths of the library
+are doing, e.g.
+
+    >>> instrumentation.enable(timers=True)
+    >>> JW.get(6)
+    >>> instrumentation.stats()
+    {'compositions': ..., 'strand_steps': ..., 'closed_loops': ..., ...}
+
+The counters are:
+
+    `compositions`
+        Compositions of two matchings (see `involution.compose`), including
+        multiplications by a generator U_i which only rewire two strings (see
+        `involution.left_mul_U` and `involution.right_mul_U`).
+
+    `strand_steps`
+        Points of the middle line passed while composing (two for every
+        multiplication by a generator).
+
+    `closed_loops`
+        Closed loops removed while composing.
+
+    `condense_merges`
+        Terms of `TL` products and sums which were merged with another term
+        of the same shape or cancelled, including the products accumulated
+        straight into a sum (see `TL._compose_into`, e.g. by `JW.get`).
+
+    `cache_hits`, `cache_misses`
+        Lookups in the composition cache (see `cache`).
+
+With `timers=True` the number of calls and the total time of `Diagram.compose`,
+`Diagram.tensor`, `TL.compose`, `TL._compose_into`, `TL.tensor`, `TL.__add__`
+and `JW._calculate_step` are recorded as well.
+
+Enabling wraps these functions, disabling puts the originals back.
+So while the instrumentation is off, it costs nothing at all.
+"""
+
+import time
+from . import cache
+from . import involution
+from .diagram import Diagram
+from .jones_wenzl import JW
+from .tl import TL
+
+COUNTERS = ["compositions", "strand_steps", "closed_loops", "condense_merges"]
+
+# The functions which are timed with `timers=True`
+TIMED = [
+    (Diagram, "compose"),
+    (Diagram, "tensor"),
+    (TL, "compose"),
+    (TL, "_compose_into"),
+    (TL, "tensor"),
+    (TL, "__add__"),
+    (JW, "_calculate_step")
+]
+
+
+class Instrumentation:
+    _counters = {name: 0 for name in COUNTERS}
+
+    # Maps the name of a timed function to [calls, seconds]
+    _timers = {}
+
+    # Maps (owner, name) to the original of every wrapped function
+    _originals = {}
+
+
+def _wrap(owner, name, wrapper):
+    original = owner.__dict__[name]
+    Instrumentation._originals.setdefault((owner, name), original)
+    setattr(owner, name, wrapper(original))
+
+
+def _count_compose(original):
+    counters = Instrumentation._counters
+
+    def compose(top, bottom, n):
+        partners, loops = original(top, bottom, n)
+        counters["compositions"] += 1
+        counters["strand_steps"] += n
+        counters["closed_loops"] += loops
+
+        return partners, loops
+
+    return compose
+
+
+def _count_mul_U(original):
+    counters = Instrumentation._counters
+
+    def mul_U(shape, i):
+        shape, loops = original(shape, i)
+        counters["compositions"] += 1
+        counters["strand_steps"] += 2
+        counters["closed_loops"] += loops
+
+        return shape, loops
+
+    return mul_U
+
+
+def _count_products(original):
+    counters = Instrumentation._counters
+
+    # Keeps the signature of `TL.compose` and `TL.tensor`
+    def product(self, tl):
+        merges = counters["condense_merges"]
+        result = original(self, tl)
+
+        # Replaces what `TL._compose_into` counted for the same product
+        counters["condense_merges"] = merges + len(self._terms) * len(tl._terms) - len(result._terms)
+
+        return result
+
+    return product
+
+
+def _count_accumulated_products(original):
+    counters = Instrumentation._counters
+
+    def compose_into(self, tl, terms, scalar=1):
+        size = len(terms)
+        result = original(self, tl, terms, scalar)
+
+        # Every pair of terms either adds a new shape or is merged
+        counters["condense_merges"] += len(self._terms) * len(tl._terms) - (len(result) - size)
+
+        return result
+
+    return compose_into
+
+
+def _count_sum(original):
+    counters = Instrumentation._counters
+
+    def add(self, other):
+        result = original(self, other)
+        counters["condense_merges"] += len(self._terms) + len(other._terms) - len(result._terms)
+
+        return result
+
+    return add
+
+
+def _time(name):
+    timers = Instrumentation._timers
+
+    def wrapper(original):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer = timers.setdefault(name, [0, 0.0])
+                timer[0] += 1
+                timer[1] += time.perf_counter() - start
+
+        return timed
+
+    return wrapper
+
+
+def enable(timers=False):
+    """
+    Start counting (and timing, if `timers`).
+    """
+
+    disable()
+
+    _wrap(involution, "compose", _count_compose)
+    _wrap(involution, "left_mul_U", _count_mul_U)
+    _wrap(involution, "right_mul_U", _count_mul_U)
+    _wrap(TL, "compose", _count_products)
+    _wrap(TL, "_compose_into", _count_accumulated_products)
+    _wrap(TL, "tensor", _count_products)
+    _wrap(TL, "__add__", _count_sum)
+
+    if timers:
+        for owner, name in TIMED:
+            _wrap(owner, name, _time(f"{owner.__name__}.{name}"))
+
+
+def disable():
+    """
+    Stop counting and timing, the statistics are kept.
+    """
+
+    for (owner, name), original in Instrumentation._originals.items():
+        setattr(owner, name, original)
+
+    Instrumentation._originals.clear()
+
+
+def enabled():
+    return bool(Instrumentation._originals)
+
+
+def stats():
+    """
+    All counters and timers as a `dict`.
+    """
+
+    cache_stats = cache.stats()
+
+    result = dict(Instrumentation._counters)
+    result["cache_hits"] = cache_stats["hits"]
+    result["cache_misses"] = cache_stats["misses"]
+    result["timers"] = {name: {"calls": calls, "seconds": seconds}
+                        for name, (calls, seconds) in Instrumentation._timers.items()}
+
+    return result
+
+
+def reset():
+    """
+    Set all counters and timers back to 0.
+    """
+
+    for name in COUNTERS:
+        Instrumentation._counters[name] = 0
+
+    Instrumentation._timers.clear()
+    cache._cache.hits = 0
+    cache._cache.misses = 0
@@ -0,0 +1,91 @@
+from . import instrumentation
+from . import involution
+from .diagram import Diagram
+from .jones_wenzl import JW
+from .tl import TL
+
+
+def test(n = 5):
+    test_a(n)
+
+
+def test_a(n = 5):
+    """
+    The counters and timers move while the instrumentation is enabled, and
+    disabling puts the original functions back
+    """
+
+    print("""\
++
+| Running `test_a`:
+|
+|   enable(), a * a, U_0 * U_0, JW_n: all counters and timers move
+|   disable(): the original functions are back, the counters stay
+|   reset(): all counters and timers are 0
++
+
+""")
+
+    originals = {
+        "TL.compose": TL.__dict__["compose"],
+        "TL.__add__": TL.__dict__["__add__"],
+        "Diagram.compose": Diagram.__dict__["compose"],
+        "involution.compose": involution.compose,
+        "involution.right_mul_U": involution.right_mul_U
+    }
+
+    a = TL.id(n) + TL.U(n, 0) + TL.U(n, 1)
+    u = TL.U(n, 0)
+    caches = dict(JW._caches)
+
+    try:
+        instrumentation.reset()
+        instrumentation.enable(timers=True)
+        assert instrumentation.enabled()
+
+        a * a + a
+        Diagram.U(n, 1) * Diagram.U(n, 1)
+
+        # Keyword arguments reach the timed functions
+        assert TL.compose(a, tl=a) == a * a
+        assert a._compose_into(a, {}, scalar=2)
+        loops = instrumentation.stats()["closed_loops"]
+
+        # The generator fast path closes a loop as well
+        u * u
+        assert instrumentation.stats()["closed_loops"] == loops + 1
+
+        JW._caches.clear()
+        JW.get(n)
+    finally:
+        instrumentation.disable()
+        JW._caches.clear()
+        JW._caches.update(caches)
+
+    stats = instrumentation.stats()
+    print(stats)
+
+    for name in instrumentation.COUNTERS:
+        assert stats[name] > 0
+
+    for name in ["TL.compose", "TL._compose_into", "TL.__add__", "Diagram.compose", "JW._calculate_step"]:
+        assert stats["timers"][name]["calls"] > 0
+
+    assert not instrumentation.enabled()
+    assert TL.__dict__["compose"] is originals["TL.compose"]
+    assert TL.__dict__["__add__"] is originals["TL.__add__"]
+    assert Diagram.__dict__["compose"] is originals["Diagram.compose"]
+    assert involution.compose is originals["involution.compose"]
+    assert involution.right_mul_U is originals["involution.right_mul_U"]
+
+    # Nothing is counted or timed while disabled (the cache keeps its own
+    # statistics)
+    a * a
+    assert all(instrumentation.stats()[name] == stats[name] for name in instrumentation.COUNTERS + ["timers"])
+
+    instrumentation.reset()
+    stats = instrumentation.stats()
+
+    assert all(stats[name] == 0 for name in instrumentation.COUNTERS)
+    assert stats["cache_hits"] == stats["cache_misses"] == 0
+    assert stats["timers"] == {}
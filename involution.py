@@ -0,0 +1,570 @@
+"""
+This module contains the partner-array engine behind `Diagram`.
+
+A crossingless matching on 2n vertices is stored as an `array` of length 2n
+in which every vertex index maps straight to the vertex it is matched with,
+i.e. `partners[partners[k]] == k` for every k.
+The vertices are numbered as in `Diagram`, e.g. for `Diagram.U(3, 0)`:
+
+    0 1 2
+    \_/ |
+        |
+     _  |
+    / \ |
+    5 4 3
+
+    partners == array("H", [1, 0, 3, 2, 5, 4])
+
+All functions in here work on anything that can be indexed by integers, so
+they can be fed `array`s as well as `memoryview`s of a shape.
+
+The shape of a matching is the `bytes` object holding its partner array.
+It is canonical (two matchings are equal if and only if their shapes are) and
+hashable, which makes it the key for everything that has to look diagrams up.
+
+Alternatively (see `set_shape_encoding`), the shape is the packed Dyck word
+of the matching (see `dyck`), i.e. a single `int` of 2n + 1 bits instead of
+an array of 2n unsigned shorts, e.g. for holding big elements like JW_n.
+Such shapes are composed and tensored on their bits, everything else decodes
+them into partner arrays.
+Elements built with one encoding must not be mixed with the other.
+"""
+
+from array import array
+from . import dyck
+
+# Unsigned short, i.e. up to 65536 vertices
+TYPECODE = "H"
+
+# The encodings of shapes
+PARTNER_SHAPES = 0
+DYCK_SHAPES = 1
+
+
+class ShapeEncoding:
+    # The default shape encoding
+    _encoding = PARTNER_SHAPES
+
+
+def set_shape_encoding(encoding):
+    """
+    Build new shapes as partner arrays (`PARTNER_SHAPES`) or packed Dyck
+    words (`DYCK_SHAPES`).
+    """
+
+    # Some idiot testing
+    if not encoding in (PARTNER_SHAPES, DYCK_SHAPES):
+        raise ValueError(f"`encoding` must be `PARTNER_SHAPES` or `DYCK_SHAPES`: {encoding}")
+
+    ShapeEncoding._encoding = encoding
+
+
+def get_shape_encoding():
+    return ShapeEncoding._encoding
+
+
+def from_connections(connections):
+    """
+    Turn a list of matches (a, b) into a partner array.
+
+    Raises a `ValueError` if `connections` is not a perfect matching on the
+    vertices 0, ..., 2 * len(connections) - 1.
+    """
+
+    size = 2 * len(connections)
+    partners = array(TYPECODE, bytes(2 * size))
+    seen = bytearray(size)
+
+    for a, b in connections:
+        if (not 0 <= a < size or not 0 <= b < size or a == b or
+            seen[a] or seen[b]):
+            raise ValueError(f"`connections` must be a perfect matching on the vertices 0, ..., {size - 1}: {connections}")
+
+        seen[a] = seen[b] = 1
+        partners[a] = b
+        partners[b] = a
+
+    return partners
+
+
+def to_connections(partners):
+    """
+    Turn a partner array into the list of matches (a, b) with a < b, sorted
+    by a.
+    """
+
+    return [(a, b) for a, b in enumerate(partners) if a < b]
+
+
+def to_shape(partners):
+    """
+    The shape of a partner array, in the current encoding.
+    """
+
+    if ShapeEncoding._encoding == DYCK_SHAPES:
+        return dyck.pack(dyck.from_partners(partners), len(partners) // 2)
+
+    return partners.tobytes()
+
+
+def from_shape(shape):
+    """
+    A partner array of a shape.
+    """
+
+    if isinstance(shape, int):
+        return dyck.to_partners(*dyck.unpack(shape))
+
+    partners = array(TYPECODE)
+    partners.frombytes(shape)
+
+    return partners
+
+
+def view(shape):
+    """
+    A read only partner array of a shape without copying it (unless it is a
+    Dyck word).
+    """
+
+    if isinstance(shape, int):
+        return from_shape(shape)
+
+    return memoryview(shape).cast(TYPECODE)
+
+
+def shape_size(shape):
+    """
+    The integer n of a shape on 2n vertices.
+    """
+
+    if isinstance(shape, int):
+        return (shape.bit_length() - 1) >> 1
+
+    return len(shape) // (2 * array(TYPECODE).itemsize)
+
+
+def compose(top, bottom, n):
+    """
+    Stack the matching `top` on top of the matching `bottom`, both on 2n
+    vertices.
+
+    Returns the partner array of the result and the number of closed loops.
+    Every vertex of `top` and `bottom` is visited exactly once, so this runs
+    in O(n).
+    """
+
+    size = 2 * n
+    last = size - 1
+    result = array(TYPECODE, bytes(2 * size))
+
+    # `visited[c]` is set once the point in column c of the middle line (i.e.
+    # the vertex `last - c` of `top` and the vertex c of `bottom`) is passed
+    visited = bytearray(n)
+
+    # Run all strings from the top
+    for i in range(n):
+        j = top[i]
+
+        # `top` leads back up
+        if j < n:
+            # Only follow strings in one direction
+            if i < j:
+                result[i] = j
+                result[j] = i
+
+            continue
+
+        # The string has already been run from its other end
+        if visited[last - j]:
+            continue
+
+        # Run through the combined diagram until an end is reached
+        while True:
+            # `top` leads to the middle
+            c = last - j
+            visited[c] = 1
+            k = bottom[c]
+
+            # `bottom` leads down
+            if k >= n:
+                result[i] = k
+                result[k] = i
+                break
+
+            # `bottom` leads back to the middle
+            visited[k] = 1
+            j = top[last - k]
+
+            # `top` leads back up
+            if j < n:
+                result[i] = j
+                result[j] = i
+                break
+
+    # Run all strings from the bottom which have not been reached from the top
+    for i in range(n, size):
+        k = bottom[i]
+
+        # `bottom` leads back down
+        if k >= n:
+            if i < k:
+                result[i] = k
+                result[k] = i
+
+            continue
+
+        # Every string from the bottom leading to the middle ends at the top,
+        # except for the ones leading back down through the middle
+        if visited[k]:
+            continue
+
+        while True:
+            visited[k] = 1
+            j = top[last - k]
+
+            # The walk can not lead up, because those strings are done
+            c = last - j
+            visited[c] = 1
+            k = bottom[c]
+
+            # `bottom` leads down
+            if k >= n:
+                result[i] = k
+                result[k] = i
+                break
+
+    # Whatever is left in the middle are closed loops
+    loops = 0
+
+    for start in range(n):
+        if visited[start]:
+            continue
+
+        loops += 1
+        c = start
+
+        while not visited[c]:
+            visited[c] = 1
+            c = last - top[last - c]
+            visited[c] = 1
+            c = bottom[c]
+
+    return result, loops
+
+
+def compose_shapes(top, bottom):
+    """
+    Like `compose`, but for shapes.
+
+    Returns the shape of the result and the number of closed loops.
+    """
+
+    if isinstance(top, int):
+        top, n = dyck.unpack(top)
+        word, loops = dyck.compose(top, dyck.unpack(bottom)[0], n)
+
+        return dyck.pack(word, n), loops
+
+    partners, loops = compose(view(top), view(bottom), shape_size(top))
+
+    return to_shape(partners), loops
+
+
+def compose_chain(chain, n):
+    """
+    Stack the matchings in `chain` (all on 2n vertices) on top of each other,
+    the first at the top.
+
+    Returns the partner array of the result and the number of closed loops.
+    The k matchings are a single graph on the (k + 1) * n points where the
+    strings cross the k + 1 horizontal lines (the top, the k - 1 lines
+    between the matchings and the bottom).
+    Every match joins two of them, so all strings are resolved in a single
+    union-find pass, and every component not reaching the top or the bottom
+    is a closed loop.
+    """
+
+    size = 2 * n
+    last = size - 1
+    k = len(chain)
+
+    # The point in column c of line j is j * n + c
+    parent = list(range((k + 1) * n))
+    unions = 0
+
+    for j, partners in enumerate(chain):
+        top = j * n
+        bottom = top + n + last
+
+        for a in range(size):
+            b = partners[a]
+
+            if b < a:
+                continue
+
+            # Vertex v of matching j lies on line j (or on line j + 1, in the
+            # column last - v)
+            x = top + a if a < n else bottom - a
+            y = top + b if b < n else bottom - b
+
+            # Find the roots, halving the paths
+            while not parent[x] == x:
+                parent[x] = x = parent[parent[x]]
+
+            while not parent[y] == y:
+                parent[y] = y = parent[parent[y]]
+
+            if not x == y:
+                parent[x] = y
+                unions += 1
+
+    # Pair the vertices of the top and the bottom line by their components
+    result = array(TYPECODE, bytes(2 * size))
+    ends = {}
+
+    for v in range(size):
+        x = v if v < n else k * n + last - v
+
+        while not parent[x] == x:
+            parent[x] = x = parent[parent[x]]
+
+        w = ends.pop(x, None)
+
+        if w is None:
+            ends[x] = v
+        else:
+            result[v] = w
+            result[w] = v
+
+    # The n strings are (k + 1) * n - unions components, the rest are loops
+    return result, k * n - unions
+
+
+def compose_chain_shapes(shapes):
+    """
+    Like `compose_chain`, but for shapes.
+
+    Returns the shape of the result and the number of closed loops.
+    """
+
+    partners, loops = compose_chain([view(shape) for shape in shapes], shape_size(shapes[0]))
+
+    return to_shape(partners), loops
+
+
+def partial_trace(partners, n, k):
+    """
+    Close the k rightmost strands of the matching `partners` on 2n vertices,
+    i.e. join the top vertex c to the bottom vertex 2n - 1 - c around the
+    right side, for the columns c = n - k, ..., n - 1.
+
+    Returns the partner array of the result on 2(n - k) vertices and the
+    number of closed loops.
+    Every vertex is visited once, so this runs in O(n).
+    """
+
+    size = 2 * n
+    last = size - 1
+    m = n - k
+    result = array(TYPECODE, bytes(4 * m))
+
+    # Vertex v stays open if it is in one of the columns 0, ..., m - 1
+    def renumber(v):
+        return v if v < m else 2 * m - 1 - (last - v)
+
+    visited = bytearray(size)
+
+    for v in list(range(m)) + list(range(last - m + 1, size)):
+        if visited[v]:
+            continue
+
+        visited[v] = 1
+        w = partners[v]
+
+        # Go around the closed strands until an open vertex is reached
+        while m <= w <= last - m:
+            visited[w] = 1
+            w = last - w
+            visited[w] = 1
+            w = partners[w]
+
+        visited[w] = 1
+        result[renumber(v)] = renumber(w)
+        result[renumber(w)] = renumber(v)
+
+    # Whatever is left of the closed strands are loops
+    loops = 0
+
+    for start in range(m, n):
+        if visited[start]:
+            continue
+
+        loops += 1
+        v = start
+
+        while not visited[v]:
+            visited[v] = 1
+            v = partners[v]
+            visited[v] = 1
+            v = last - v
+
+    return result, loops
+
+
+def partial_trace_shapes(shape, k):
+    """
+    Like `partial_trace`, but for shapes.
+
+    Returns the shape of the result and the number of closed loops.
+    """
+
+    partners, loops = partial_trace(view(shape), shape_size(shape), k)
+
+    return to_shape(partners), loops
+
+
+def trace(partners, n):
+    """
+    The number of loops of the Markov trace of the matching `partners` on 2n
+    vertices, i.e. of closing all strands.
+    """
+
+    return partial_trace(partners, n, n)[1]
+
+
+def tensor(left, right, n_left, n_right):
+    """
+    Put the matching `left` on 2 * `n_left` vertices to the left of the
+    matching `right` on 2 * `n_right` vertices.
+    """
+
+    size = 2 * (n_left + n_right)
+    result = array(TYPECODE, bytes(2 * size))
+
+    # The bottom of `left` moves behind all vertices of `right`
+    right_half_offset = 2 * n_right
+
+    for a in range(2 * n_left):
+        b = left[a]
+
+        if a >= n_left:
+            a += right_half_offset
+
+        if b >= n_left:
+            b += right_half_offset
+
+        result[a] = b
+
+    for a in range(2 * n_right):
+        result[a + n_left] = right[a] + n_left
+
+    return result
+
+
+def tensor_shapes(left, right):
+    """
+    Like `tensor`, but for shapes.
+    """
+
+    if isinstance(left, int):
+        left, n_left = dyck.unpack(left)
+        right, n_right = dyck.unpack(right)
+
+        return dyck.pack(dyck.tensor(left, right, n_left, n_right), n_left + n_right)
+
+    return to_shape(tensor(view(left), view(right), shape_size(left), shape_size(right)))
+
+
+def through_strands(n, k):
+    """
+    The partners of the vertices n, ..., n + 2k - 1 of the matching on
+    2(n + k) vertices whose k rightmost strands go straight down, in order.
+    """
+
+    last = 2 * (n + k) - 1
+
+    return array(TYPECODE, [last - v for v in range(n, n + 2 * k)])
+
+
+def add_through_strands(partners, n, k, strands=None):
+    """
+    Put k strands going straight down to the right of the matching `partners`
+    on 2n vertices, i.e. like `tensor` with the identity on 2k vertices.
+
+    The top vertices keep their numbers and the bottom vertices move by 2k,
+    so this only offsets and splices.
+    `strands` may be passed in from `through_strands`.
+    """
+
+    offset = 2 * k
+    result = array(TYPECODE, [b if b < n else b + offset for b in partners])
+    result[n:n] = through_strands(n, k) if strands is None else strands
+
+    return result
+
+
+def _mul_U(shape, a, b):
+    # Join the vertices a and b by a cap: their old partners get joined to
+    # each other, unless a and b are a cap already (then a loop is closed)
+    partners = from_shape(shape)
+    x, y = partners[a], partners[b]
+
+    if x == b:
+        return shape, 1
+
+    partners[x] = y
+    partners[y] = x
+    partners[a] = b
+    partners[b] = a
+
+    return to_shape(partners), 0
+
+
+def left_mul_U(shape, i):
+    """
+    Stack U_i on top of the matching with the shape `shape`, by rewiring the
+    top vertices i and i + 1 only.
+
+    Returns the shape of the result and the number of closed loops.
+    """
+
+    return _mul_U(shape, i, i + 1)
+
+
+def right_mul_U(shape, i):
+    """
+    Stack the matching with the shape `shape` on top of U_i, by rewiring the
+    bottom vertices below the columns i and i + 1 only.
+
+    Returns the shape of the result and the number of closed loops.
+    """
+
+    last = 2 * shape_size(shape) - 1
+
+    return _mul_U(shape, last - i - 1, last - i)
+
+
+def generator_index(shape):
+    """
+    The i for which `shape` is the shape of U_i, or `None`.
+    """
+
+    partners = view(shape)
+    n = len(partners) // 2
+    last = 2 * n - 1
+
+    # The first column without a string straight down
+    i = 0
+
+    while i < n and partners[i] == last - i:
+        i += 1
+
+    if not i < n - 1 or not partners[i] == i + 1 or not partners[last - i] == last - i - 1:
+        return None
+
+    for k in range(i + 2, n):
+        if not partners[k] == last - k:
+            return None
+
+    return i
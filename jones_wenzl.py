@@ -1,24 +1,306 @@
+"""
+This module contains the Jones-Wenzl projectors JW_n.
+There are two engines to calculate them:
+
+    `RECURSIVE`
+        This is the default engine.
+        JW_n is calculated from JW_{n-1} by Wenzl's recursion
+
+            JW_n = (JW_{n-1} & id_1) - [n-1] / [n] * (JW_{n-1} & id_1) * U_{n-2} * (JW_{n-1} & id_1),
+
+        which costs two products of ever larger elements for every level.
+
+    `SINGLE_CLASP`
+        The coefficient of every basis diagram D of TL_n is calculated on its
+        own, without any products of elements, from the single clasp expansion
+
+            JW_n = (JW_{n-1} & id_1) * sum_i (-1)^(n-1-i) [i+1] / [n] * U_{n-2} * U_{n-3} * ... * U_i,
+
+        where the summand for i == n - 1 is the identity.
+        Every summand maps (at most) one basis diagram E of TL_{n-1} to D
+        without closing loops, so the coefficient of D is a sum of at most n
+        coefficients of JW_{n-1}, e.g.
+
+        >>> set_engine(SINGLE_CLASP)
+        >>> JW.coefficient(12, Diagram.U(12, 5))
+
+Here [k] are the quantum integers at the current loop value delta (see
+`coefficients`), i.e. [0] = 0, [1] = 1 and [k + 1] = delta * [k] - [k - 1].
+"""
+
 from fractions import Fraction
+from array import array
+from . import catalan
+from . import coefficients
+from . import involution
+from . import lazy
+from . import store
 from .tl import TL
 
+RECURSIVE = 0
+SINGLE_CLASP = 1
+
+
+def set_engine(engine):
+    Engine._engine = engine
+
+
+class Engine:
+    # The default engine
+    _engine = RECURSIVE
+
 
 class JW:
-    _cache = [TL.id(1)]
+    """
+    The Jones-Wenzl projectors.
+
+    `_caches: dict`
+            For each coefficient mode and loop value (see `coefficients`) and
+            shape encoding (see `involution`) a mapping of n to the projector JW_n, for all n calculated so far.
+    """
+
+    _caches = {}
 
     def get(n):
-        for i in range(n - len(JW._cache)):
-            JW._calculate_step()
+        """
+        JW_n, looked up in memory, then in the persistent store (if a
+        directory is set, see `store`) and calculated otherwise.
+        """
+
+        cache = JW._get_cache()
+        jw = JW._lookup(cache, n)
+
+        if jw is not None:
+            return jw
+
+        if Engine._engine == SINGLE_CLASP:
+            JW._keep(cache, n, JW._calculate_single_clasp(n))
+
+            return cache[n]
+
+        # Continue from the biggest projector calculated so far
+        m = max(k for k in cache if k < n)
+
+        for k in range(m + 1, n + 1):
+            if JW._lookup(cache, k) is None:
+                JW._keep(cache, k, JW._calculate_step(cache[k - 1], k))
+
+        return cache[n]
+
+    def _lookup(cache, n):
+        # JW_n from memory or the persistent store (or `None`)
+        jw = cache.get(n)
+
+        if jw is None and store.get_directory() is not None:
+            jw = store.load(n)
+
+            if jw is not None:
+                cache[n] = jw
+
+        return jw
+
+    def _keep(cache, n, jw):
+        # Remember a calculated projector in memory and the persistent store
+        cache[n] = jw
+
+        if store.get_directory() is not None:
+            store.save(n, jw)
+
+    def _cache_key():
+        return (coefficients.get_mode().key, coefficients.get_loop_value(), involution.get_shape_encoding())
+
+    def _get_cache():
+        mode = coefficients.get_mode()
+        key = JW._cache_key()
+        cache = JW._caches.get(key)
+
+        if cache is None:
+            cache = JW._caches[key] = {1: mode.convert(1) * TL.id(1)}
+
+        return cache
+
+    def _calculate_step(jw, n):
+        """
+        Calculate JW_n from `jw`, i.e. JW_{n-1}.
+        """
+
+        mode = coefficients.get_mode()
+
+        # Now perform the recursive step, accumulating the product straight
+        # into the sum (see `lazy`)
+        jw_fat = lazy.lift(jw.extend(1))
+        jw_n = jw_fat + mode.convert(JW._ratio(n)) * jw_fat * TL.U(n, n - 2) * jw_fat
+
+        return jw_n.evaluate()
+
+    def _quantum_integers(n):
+        """
+        The quantum integers [0], ..., [n] at the current loop value.
+        """
+
+        delta = coefficients.get_loop_value()
+        quantum_integers = [0, 1]
+
+        for k in range(n - 1):
+            quantum_integers.append(delta * quantum_integers[-1] - quantum_integers[-2])
+
+        return quantum_integers[:n + 1]
+
+    def _divide(a, b):
+        # Exactly, unless the loop value is a float
+        if isinstance(b, float):
+            return a / b
+
+        return Fraction(a) / b
+
+    def _ratio(n):
+        """
+        The factor -[n-1] / [n] of the recursive step.
+
+        For delta == -2 this is (n - 1) / n.
+        """
+
+        quantum_integers = JW._quantum_integers(n)
+
+        if quantum_integers[n] == 0:
+            raise ValueError(f"JW_{n} does not exist for the loop value {coefficients.get_loop_value()}")
+
+        return JW._divide(-quantum_integers[n - 1], quantum_integers[n])
+
+    def _clasp_weights(n):
+        """
+        The weights (-1)^(n-1-i) [i+1] / [n] of the single clasp expansion of
+        JW_n in the current coefficient mode.
+        """
+
+        mode = coefficients.get_mode()
+        quantum_integers = JW._quantum_integers(n)
+
+        if quantum_integers[n] == 0:
+            raise ValueError(f"JW_{n} does not exist for the loop value {coefficients.get_loop_value()}")
+
+        return [mode.convert(JW._divide((-1) ** (n - 1 - i) * quantum_integers[i + 1], quantum_integers[n]))
+                for i in range(n)]
+
+    def _clasp_preimage(partners, n, i):
+        """
+        The shape of the basis diagram E of TL_{n-1} with
+
+            (E & id_1) * U_{n-2} * ... * U_i == D,
+
+        where D is given by `partners` (for i == n - 1 the product is
+        `E & id_1`), or `None` if there is no such E.
+        """
+
+        last = 2 * n - 1
+
+        # The vertices of D which do not exist in E
+        if i == n - 1:
+            # A string straight down on the right
+            if not partners[n - 1] == n:
+                return None
+
+            removed = (n - 1, n)
+        else:
+            # A cap at the bottom between the columns i and i + 1
+            if not partners[last - i] == last - i - 1:
+                return None
+
+            removed = (last - i - 1, last - i)
+
+        # Where the vertices of D end up in E
+        size = 2 * (n - 1)
+        position = [0 for k in range(2 * n)]
+
+        for c in range(n - 1):
+            position[c] = c
+
+        # The right string of the top leads to the bottom of E on the right
+        position[n - 1] = n - 1
+
+        for c in range(n):
+            if last - c in removed:
+                continue
+
+            if i == n - 1 or c < i:
+                position[last - c] = size - 1 - c
+            else:
+                position[last - c] = size - 1 - (c - 2)
+
+        result = array(involution.TYPECODE, bytes(2 * size))
+
+        for k in range(2 * n):
+            if k in removed:
+                continue
+
+            result[position[k]] = position[partners[k]]
+
+        # E has to be crossingless
+        openers = []
+
+        for k in range(size):
+            if result[k] > k:
+                openers.append(k)
+            elif not openers or not openers.pop() == result[k]:
+                return None
+
+        return involution.to_shape(result)
+
+    def _clasp_coefficient(n, shape, weights, memo):
+        """
+        The coefficient of the basis diagram `shape` in JW_n.
+
+        `weights` maps m to the weights of the single clasp expansion of
+        JW_m and `memo` maps (m, shape) to coefficients calculated so far.
+        """
+
+        if n == 1:
+            return coefficients.get_mode().convert(1)
+
+        coefficient = memo.get((n, shape))
+
+        if coefficient is not None:
+            return coefficient
+
+        partners = involution.view(shape)
+
+        if not n in weights:
+            weights[n] = JW._clasp_weights(n)
+
+        coefficient = 0
+
+        for i, weight in enumerate(weights[n]):
+            preimage = JW._clasp_preimage(partners, n, i)
+
+            if preimage is not None:
+                coefficient = coefficient + weight * JW._clasp_coefficient(n - 1, preimage, weights, memo)
+
+        memo[(n, shape)] = coefficient
+
+        return coefficient
+
+    def coefficient(n, diagram):
+        """
+        The coefficient of the shape of `diagram` in JW_n, calculated from
+        the single clasp expansion.
+        """
+
+        return JW._clasp_coefficient(n, diagram.shape(), {}, {})
 
-        return JW._cache[n - 1]
+    def _calculate_single_clasp(n):
+        """
+        Calculate JW_n diagram by diagram.
+        """
 
-    def _calculate_step():
-        # We want to calculate JW_n
-        n = len(JW._cache) + 1
+        weights = {}
+        memo = {}
+        terms = coefficients.get_mode().terms()
 
-        jw = JW._cache[-1]
+        for index in range(catalan.catalan(n)):
+            shape = catalan.unrank_shape(n, index)
+            coefficient = JW._clasp_coefficient(n, shape, weights, memo)
 
-        # Now perform the recursive step
-        jw_fat = jw & TL.id(1)
-        jw_n = jw_fat + Fraction(n - 1, n) * jw_fat * TL.U(n, n - 2) * jw_fat
+            if not coefficient == 0:
+                terms[shape] = coefficient
 
-        JW._cache.append(jw_n)
+        return TL._from_terms(n, terms)
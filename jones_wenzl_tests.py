@@ -0,0 +1,173 @@
+from fractions import Fraction
+import tempfile
+from . import coefficients
+from . import driver
+from . import store
+from .jones_wenzl import JW
+from .tl import TL
+
+
+def test(n = 5):
+    test_a(n)
+    print("\n\n\n")
+    test_b(n)
+    print("\n\n\n")
+    test_c(n)
+    print("\n\n\n")
+    test_d(n)
+    print("\n\n\n")
+    test_e(n)
+
+
+def test_a(n = 5):
+    """
+    JW_n is idempotent and annihilated by all U_i
+    """
+
+    print("""\
++
+| Running `test_a`:
+|
+|   JW_n * JW_n = JW_n, JW_n * U_i = U_i * JW_n = 0.
++
+
+""")
+
+    jw = JW.get(n)
+    print(jw)
+
+    assert jw * jw == jw
+
+    for i in range(n - 1):
+        assert jw * TL.U(n, i) == 0
+        assert TL.U(n, i) * jw == 0
+
+
+def test_b(n = 5):
+    """
+    The single clasp expansion gives the same projectors as the recursion
+    """
+
+    print("""\
++
+| Running `test_b`:
+|
+|   JW_n (single clasp) = JW_n (recursive) for several loop values.
++
+
+""")
+
+    loop_value = coefficients.get_loop_value()
+
+    try:
+        for value in [-2, Fraction(5, 2), Fraction(-7, 3)]:
+            coefficients.set_loop_value(value)
+
+            for m in range(1, n + 1):
+                print(f"delta = {value}, JW_{m}")
+                assert JW._calculate_single_clasp(m) == JW.get(m)
+    finally:
+        coefficients.set_loop_value(loop_value)
+
+
+def test_c(n = 5):
+    """
+    Projectors read back from the persistent store are the calculated ones
+    """
+
+    print("""\
++
+| Running `test_c`:
+|
+|   load(save(JW_n)) = JW_n in the exact, float and modular modes.
++
+
+""")
+
+    mode = coefficients.get_mode()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            store.set_directory(directory)
+
+            for m in [coefficients.EXACT, coefficients.FLOAT, coefficients.Modular(1000003)]:
+                coefficients.set_mode(m)
+                print(f"{m.key}: {store.path(n)}")
+
+                assert store.load(n) is None
+
+                jw = JW.get(n)
+                store.save(n, jw)
+
+                assert store.load(n) == jw
+
+                # Forget JW_n in memory, so it is read from the store
+                JW._get_cache().pop(n)
+
+                assert JW.get(n) == jw
+    finally:
+        store.set_directory(None)
+        coefficients.set_mode(mode)
+
+
+def test_d(n = 5):
+    """
+    The driver continues from its checkpoints
+    """
+
+    print("""\
++
+| Running `test_d`:
+|
+|   Running the driver up to n - 1 and then up to n only calculates JW_n.
++
+
+""")
+
+    levels = []
+
+    def progress(m, terms, seconds):
+        print(f"JW_{m}: {terms} terms in {seconds:.3f}s")
+        levels.append(m)
+
+    with tempfile.TemporaryDirectory() as directory:
+        driver.run(n - 1, directory, progress)
+
+        # Forget the projectors in memory, so the checkpoints are used
+        for m in range(2, n + 1):
+            JW._get_cache().pop(m, None)
+
+        levels.clear()
+        jw = driver.run(n, directory, progress)
+
+    assert levels == [n]
+    assert jw == JW._calculate_single_clasp(n)
+
+
+def test_e(n = 5):
+    """
+    The traces of JW_k are the quantum dimensions, and closing the last strand
+    of JW_k gives a multiple of JW_(k-1)
+    """
+
+    print("""\
++
+| Running `test_e`:
+|
+|   tr(JW_k) = [k + 1], ptr(JW_k) = [k + 1] / [k] JW_(k-1)
+|
+| for k = 2, ..., n
++
+
+""")
+
+    quantum_integers = JW._quantum_integers(n + 1)
+
+    for k in range(2, n + 1):
+        jw = JW.get(k)
+        ratio = Fraction(quantum_integers[k + 1], quantum_integers[k])
+        print(f"tr(JW_{k}) = {jw.trace()}")
+
+        assert jw.trace() == quantum_integers[k + 1]
+        assert jw.partial_trace(1) == ratio * JW.get(k - 1)
+        assert jw.partial_trace(k - 1).trace() == jw.trace()
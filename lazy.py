@@ -0,0 +1,294 @@
+"""
+This module contains (opt-in) lazy arithmetic of `TL` elements.
+
+Lifting an element turns `*`, `&` and `+` (and scalar multiples) into nodes
+of an expression graph, which is only calculated when `evaluate` is called,
+e.g.
+
+    >>> a, u = lazy.lift(jw_fat), lazy.lift(TL.U(n, n - 2))
+    >>> (a + ratio * a * u * a).evaluate()
+
+Evaluating
+
+    - multiplies chains of products in the order with the least estimated
+      work (by the number of terms of the factors, as for matrix chains),
+
+    - calculates equal subexpressions (e.g. the same factors, multiplied in
+      the same order) only once,
+
+    - accumulates sums of products in a single pass, without building and
+      condensing the products on their own.
+
+Plain `TL`s may be mixed with expressions, e.g. `lazy.lift(a) * b`.
+"""
+
+from . import catalan
+from . import coefficients
+from .tl import TL
+
+
+def lift(tl):
+    """
+    The lazy expression of an element.
+    """
+
+    return Leaf(tl)
+
+
+def _expression(other):
+    # Lift `other` if it is a `TL`, keep it if it is an expression
+    if isinstance(other, TL):
+        return Leaf(other)
+
+    if isinstance(other, Expression):
+        return other
+
+    return None
+
+
+class Expression:
+    """
+    A node of the expression graph.
+
+    `n: int`
+            The integer n in TL_n.
+
+    `key: tuple`
+            Equal for equal subexpressions.
+
+    `estimate: int`
+            The estimated number of terms of the value.
+    """
+
+    n: int
+    key: tuple
+    estimate: int
+
+    def evaluate(self):
+        """
+        Calculate the value of the expression (a `TL`).
+        """
+
+        return self._evaluate({})
+
+    def _evaluate(self, memo):
+        value = memo.get(self.key)
+
+        if value is None:
+            value = memo[self.key] = self._calculate(memo)
+
+        return value
+
+    def __mul__(self, other):
+        other = _expression(other)
+
+        if other is None:
+            return NotImplemented
+
+        return Product(self._factors() + other._factors())
+
+    def __rmul__(self, other):
+        # other * Expression
+        # => other is TL or scalar
+        if isinstance(other, TL):
+            return Leaf(other) * self
+
+        return Sum([(other, self)])
+
+    def __and__(self, other):
+        other = _expression(other)
+
+        if other is None:
+            return NotImplemented
+
+        return Tensor(self, other)
+
+    __matmul__ = __and__
+
+    def __rand__(self, other):
+        return Tensor(Leaf(other), self)
+
+    __rmatmul__ = __rand__
+
+    def __add__(self, other):
+        other = _expression(other)
+
+        if other is None:
+            return NotImplemented
+
+        return Sum(self._summands() + other._summands())
+
+    def __radd__(self, other):
+        # other + Expression
+        # => other is TL, or 0 (called by `sum`)
+        if isinstance(other, TL):
+            return Leaf(other) + self
+
+        return self
+
+    def _factors(self):
+        # The factors when multiplied, so chains of products are flat
+        return [self]
+
+    def _summands(self):
+        # The pairs of scalar and expression when added, so sums are flat
+        return [(1, self)]
+
+
+class Leaf(Expression):
+    """
+    An element.
+    """
+
+    def __init__(self, tl):
+        self.n = tl.n
+        self.tl = tl
+        self.key = ("leaf", id(tl))
+        self.estimate = len(tl._terms)
+
+    def _calculate(self, memo):
+        return self.tl
+
+
+class Product(Expression):
+    """
+    A chain of products.
+
+    The cheapest order (see `_chain_orders`) is only found once the chain is
+    evaluated, and all subchains are evaluated with the same table.
+    """
+
+    def __init__(self, factors):
+        self.n = factors[0].n
+        self.factors = factors
+        self.key = ("*",) + tuple(factor.key for factor in factors)
+
+        # Every order gives the same estimate, see `_chain_orders`
+        estimate = 1
+
+        for factor in factors:
+            estimate = min(estimate * factor.estimate, catalan.catalan(self.n))
+
+        self.estimate = estimate
+        self._orders = None
+
+    def _factors(self):
+        return self.factors
+
+    def _split(self, i, j, memo):
+        # The values of both sides of the last product of the factors i to j
+        # in the cheapest order
+        if self._orders is None:
+            self._orders = _chain_orders([factor.estimate for factor in self.factors], catalan.catalan(self.n))
+
+        m = self._orders[i, j][2]
+
+        return self._evaluate_chain(i, m, memo), self._evaluate_chain(m + 1, j, memo)
+
+    def _evaluate_chain(self, i, j, memo):
+        # The value of the factors i to j, remembered like a `Product` of them
+        if i == j:
+            return self.factors[i]._evaluate(memo)
+
+        key = ("*",) + tuple(factor.key for factor in self.factors[i:j + 1])
+        value = memo.get(key)
+
+        if value is None:
+            top, bottom = self._split(i, j, memo)
+            value = memo[key] = top * bottom
+
+        return value
+
+    def split(self, memo):
+        """
+        The values of both sides of the last product in the cheapest order.
+        """
+
+        return self._split(0, len(self.factors) - 1, memo)
+
+    def _calculate(self, memo):
+        top, bottom = self.split(memo)
+
+        return top * bottom
+
+
+def _chain_orders(estimates, bound):
+    """
+    The cheapest order to multiply a chain of factors with `estimates` terms,
+    where the work of a product is the number of pairs of terms and a product
+    has at most `bound` terms.
+
+    Maps (i, j) to the work, the estimated terms and the last split m, i.e.
+    (factors i to m) * (factors m + 1 to j).
+    """
+
+    orders = {(i, i): (0, estimate, None) for i, estimate in enumerate(estimates)}
+
+    for length in range(2, len(estimates) + 1):
+        for i in range(len(estimates) - length + 1):
+            j = i + length - 1
+            best = None
+
+            for m in range(i, j):
+                work_left, terms_left, split = orders[i, m]
+                work_right, terms_right, split = orders[m + 1, j]
+                work = work_left + work_right + terms_left * terms_right
+
+                if best is None or work < best[0]:
+                    best = (work, min(terms_left * terms_right, bound), m)
+
+            orders[i, j] = best
+
+    return orders
+
+
+class Tensor(Expression):
+    """
+    A tensor product.
+    """
+
+    def __init__(self, left, right):
+        self.n = left.n + right.n
+        self.left = left
+        self.right = right
+        self.key = ("&", left.key, right.key)
+        self.estimate = min(left.estimate * right.estimate, catalan.catalan(self.n))
+
+    def _calculate(self, memo):
+        return self.left._evaluate(memo) & self.right._evaluate(memo)
+
+
+class Sum(Expression):
+    """
+    A linear combination of expressions.
+    """
+
+    def __init__(self, summands):
+        self.n = summands[0][1].n
+        self.summands = summands
+        self.key = ("+",) + tuple((scalar, expression.key) for scalar, expression in summands)
+        self.estimate = min(sum(expression.estimate for scalar, expression in summands), catalan.catalan(self.n))
+
+    def _summands(self):
+        return self.summands
+
+    def __rmul__(self, other):
+        # Scale all summands
+        if isinstance(other, TL):
+            return Leaf(other) * self
+
+        return Sum([(other * scalar, expression) for scalar, expression in self.summands])
+
+    def _calculate(self, memo):
+        terms = coefficients.get_mode().terms()
+
+        for scalar, expression in self.summands:
+            if isinstance(expression, Product) and not expression.key in memo:
+                # Accumulate the last product right away
+                top, bottom = expression.split(memo)
+                top._compose_into(bottom, terms, scalar)
+            else:
+                for shape, coefficient in expression._evaluate(memo)._terms.items():
+                    terms[shape] = terms.get(shape, 0) + scalar * coefficient
+
+        return TL._from_terms(self.n, terms).condense_diagrams()
@@ -0,0 +1,207 @@
+"""
+This module recovers exact results from calculations modulo primes.
+
+Calculating with `Fraction`s spends most of its time in big integer gcds.
+Instead, the same calculation is run in the coefficient modes
+`coefficients.Modular(p)` for several machine-word primes p, the residues of
+every coefficient are combined by the Chinese remainder theorem, and the
+`Fraction` is recovered by rational reconstruction, e.g.
+
+    >>> modular.jw(6) == JW.get(6)
+    True
+
+More primes are used until the reconstructed coefficients no longer change.
+"""
+
+from fractions import Fraction
+from math import isqrt
+from . import coefficients
+from .jones_wenzl import JW
+from .tl import TL
+
+# All primes are below this bound, so products of residues stay small
+PRIME_BOUND = 1 << 30
+
+# The maximal number of primes used before giving up
+MAX_PRIMES = 64
+
+
+def _is_prime(p):
+    # Miller-Rabin, deterministic for p < 3.3 * 10^24
+    if p < 2:
+        return False
+
+    witnesses = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+    for q in witnesses:
+        if p % q == 0:
+            return p == q
+
+    d, s = p - 1, 0
+
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in witnesses:
+        x = pow(a, d, p)
+
+        if x == 1 or x == p - 1:
+            continue
+
+        for i in range(s - 1):
+            x = x * x % p
+
+            if x == p - 1:
+                break
+        else:
+            return False
+
+    return True
+
+
+def word_primes():
+    """
+    Lazily enumerate the primes below `PRIME_BOUND`, largest first.
+    """
+
+    p = PRIME_BOUND - 1
+
+    while p > 2:
+        if _is_prime(p):
+            yield p
+
+        p -= 2
+
+
+def crt(residues, moduli):
+    """
+    The x in 0, ..., M - 1 with x == r (mod m) for all r, m in `residues` and
+    `moduli`, where M is the product of the (pairwise coprime) moduli.
+
+    Returns x and M.
+    """
+
+    x, modulus = 0, 1
+
+    for r, m in zip(residues, moduli):
+        # x + modulus * t == r (mod m)
+        t = (r - x) * pow(modulus, -1, m) % m
+        x += modulus * t
+        modulus *= m
+
+    return x, modulus
+
+
+def rational_reconstruction(a, m):
+    """
+    The `Fraction` p / q with p == a * q (mod m) and |p|, q <= sqrt(m / 2), or
+    `None` if there is no such fraction.
+    """
+
+    bound = isqrt(m // 2)
+
+    # Run the extended Euclidean algorithm on (m, a) until the remainder is
+    # small enough
+    r0, r1 = m, a % m
+    t0, t1 = 0, 1
+
+    while r1 > bound:
+        quotient = r0 // r1
+        r0, r1 = r1, r0 - quotient * r1
+        t0, t1 = t1, t0 - quotient * t1
+
+    if t1 == 0 or abs(t1) > bound:
+        return None
+
+    return Fraction(r1, t1)
+
+
+def solve(calculate, primes=None):
+    """
+    Run `calculate` (returning a `TL`) in the coefficient modes `Modular(p)`
+    and reconstruct the exact result.
+
+    Primes are added until the reconstruction stays the same for one more
+    prime.
+    The projectors `calculate` leaves in memory for every prime (see `JW`)
+    are dropped as soon as the residues are read.
+    Raises a `ValueError` if that does not happen within `MAX_PRIMES` primes.
+    """
+
+    if primes is None:
+        primes = word_primes()
+
+    previous_mode = coefficients.get_mode()
+    kept_caches = set(JW._caches)
+
+    moduli = []
+    residues = {}
+    n = None
+    previous = None
+
+    try:
+        for p in primes:
+            if len(moduli) == MAX_PRIMES:
+                break
+
+            mode = coefficients.Modular(p)
+            coefficients.set_mode(mode)
+            tl = calculate()
+            n = tl.n
+
+            # Coefficients which are 0 modulo p are missing
+            for shape in tl._terms:
+                residues.setdefault(shape, [0 for m in moduli])
+
+            for shape, values in residues.items():
+                coefficient = tl._terms.get(shape)
+                values.append(0 if coefficient is None else coefficients.ModInt(coefficient, p).value)
+
+            # Only the residues are needed from here on
+            key = JW._cache_key()
+
+            if not key in kept_caches:
+                JW._caches.pop(key, None)
+
+            tl = None
+
+            moduli.append(p)
+
+            current = _reconstruct(residues, moduli)
+
+            if current is not None and current == previous:
+                # Exact coefficients, whatever the current mode is
+                return TL._from_terms(n, {shape: coefficient for shape, coefficient in current.items()
+                                          if not coefficient == 0})
+
+            previous = current
+    finally:
+        coefficients.set_mode(previous_mode)
+
+    raise ValueError(f"The rational reconstruction did not stabilize with {len(moduli)} primes")
+
+
+def _reconstruct(residues, moduli):
+    # The exact terms, or `None` if some coefficient can not be reconstructed
+    terms = {}
+
+    for shape, values in residues.items():
+        a, m = crt(values, moduli)
+        coefficient = rational_reconstruction(a, m)
+
+        if coefficient is None:
+            return None
+
+        terms[shape] = coefficient
+
+    return terms
+
+
+def jw(n, primes=None):
+    """
+    The Jones-Wenzl projector JW_n with exact coefficients, calculated modulo
+    primes.
+    """
+
+    return solve(lambda: JW.get(n), primes)
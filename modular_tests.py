@@ -0,0 +1,105 @@
+from fractions import Fraction
+from . import coefficients
+from . import involution
+from . import modular
+from .jones_wenzl import JW
+from .tl import TL
+
+
+def test(n = 5):
+    test_a(n)
+    print("\n\n\n")
+    test_b(n)
+    print("\n\n\n")
+    test_c(n)
+
+
+def test_a(n = 5):
+    """
+    Rational reconstruction recovers fractions with small numerators and
+    denominators from their residues
+    """
+
+    print("""\
++
+| Running `test_a`:
+|
+|   reconstruct(p / q mod m_1 * ... * m_k) = p / q.
++
+
+""")
+
+    moduli = [101, 103, 107]
+
+    for fraction in [Fraction(0), Fraction(1), Fraction(-3, 7), Fraction(22, 15), Fraction(-1, n)]:
+        residues = [fraction.numerator * pow(fraction.denominator, -1, m) % m for m in moduli]
+        a, m = modular.crt(residues, moduli)
+        print(f"{fraction} == {a} mod {m}")
+        assert modular.rational_reconstruction(a, m) == fraction
+
+
+def test_b(n = 5):
+    """
+    JW_n calculated modulo primes is JW_n
+    """
+
+    print("""\
++
+| Running `test_b`:
+|
+|   JW_n (mod p_1, ..., p_k) = JW_n.
++
+
+""")
+
+    keys = set(JW._caches)
+
+    for m in range(1, n + 1):
+        a, b = modular.jw(m), JW.get(m)
+        print(f"JW_{m}:")
+        print(a)
+        assert a == b
+
+        # No projectors modulo the primes are left behind
+        assert set(JW._caches) <= keys | {(coefficients.EXACT.key, coefficients.get_loop_value(), involution.get_shape_encoding())}
+
+
+def test_c(n = 5):
+    """
+    Elements built from diagrams, generators and fractions modulo primes are
+    the same as the exact ones
+    """
+
+    print("""\
++
+| Running `test_c`:
+|
+|   a (mod p_1, ..., p_k) = a,
+|
+| for a = id, U_0 * U_1, 1/3 U_0 + id and (-5/7 U_0 + id)^2 * U_(n-2)
++
+
+""")
+
+    calculations = [
+        lambda: TL.id(n),
+        lambda: TL.U(n, 0) * TL.U(n, 1),
+        lambda: Fraction(1, 3) * TL.U(n, 0) + TL.id(n),
+        lambda: (Fraction(-5, 7) * TL.U(n, 0) + TL.id(n)) * (Fraction(-5, 7) * TL.U(n, 0) + TL.id(n)) * TL.U(n, n - 2)
+    ]
+
+    for calculate in calculations:
+        a = modular.solve(calculate)
+        print(a)
+
+        assert coefficients.get_mode() is coefficients.EXACT
+        assert a == calculate()
+
+    # Every stored coefficient is a residue
+    try:
+        coefficients.set_mode(coefficients.Modular(11))
+
+        for calculate in calculations:
+            assert all(isinstance(c, coefficients.ModInt) and c.p == 11 for c in calculate()._terms.values())
+    finally:
+        coefficients.set_mode(coefficients.EXACT)
@@ -0,0 +1,134 @@
+"""
+This module contains the (opt-in) parallel composition of big elements.
+
+Once a number of workers is set, `TL.compose` splits products with at least
+`threshold` pairs of terms into chunks of the terms on top, composes the
+chunks on a process pool and merges the partial results, e.g.
+
+    >>> parallel.set_workers(os.cpu_count())
+    >>> JW.get(11)
+
+Smaller products stay serial, since sending the terms to the workers costs
+more than composing them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from . import cache
+from . import coefficients
+from . import involution
+
+# The number of pairs of terms from which on products are parallelized
+THRESHOLD = 1 << 18
+
+# The number of chunks per worker, to even out chunks of different costs
+CHUNKS_PER_WORKER = 4
+
+
+class Parallel:
+    # Serial by default
+    _workers = 0
+    _threshold = THRESHOLD
+    _executor = None
+
+
+def set_workers(workers):
+    """
+    Compose on a pool of `workers` processes, or serially if it is 0.
+    """
+
+    # Some idiot testing
+    if not isinstance(workers, int) or workers < 0:
+        raise ValueError(f"`workers` must be a non-negative integer: {workers}")
+
+    if Parallel._executor is not None:
+        Parallel._executor.shutdown()
+        Parallel._executor = None
+
+    Parallel._workers = workers
+
+
+def get_workers():
+    return Parallel._workers
+
+
+def set_threshold(threshold):
+    """
+    Compose products of at least `threshold` pairs of terms in parallel.
+    """
+
+    # Some idiot testing
+    if not isinstance(threshold, int) or threshold < 0:
+        raise ValueError(f"`threshold` must be a non-negative integer: {threshold}")
+
+    Parallel._threshold = threshold
+
+
+def get_threshold():
+    return Parallel._threshold
+
+
+def applies(pairs):
+    """
+    Whether a product of `pairs` pairs of terms is composed in parallel.
+    """
+
+    # Products with a zero element have nothing to distribute
+    return Parallel._workers > 0 and pairs > 0 and pairs >= Parallel._threshold
+
+
+def _executor():
+    if Parallel._executor is None:
+        Parallel._executor = ProcessPoolExecutor(Parallel._workers)
+
+    return Parallel._executor
+
+
+def _compose_chunk(top, bottom, mode_key, loop_value, encoding):
+    # Compose all pairs of terms of `top` and `bottom` in a worker, where the
+    # coefficient mode and shape encoding have to be set first
+    if not coefficients.get_mode().key == mode_key:
+        coefficients.set_mode(coefficients.from_key(mode_key))
+
+    if not coefficients.get_loop_value() == loop_value:
+        coefficients.set_loop_value(loop_value)
+
+    if not involution.get_shape_encoding() == encoding:
+        involution.set_shape_encoding(encoding)
+
+    delta = coefficients.delta()
+    terms = {}
+
+    for shape_top, a in top:
+        for shape_bottom, b in bottom:
+            shape, loops = cache.compose_shapes(shape_top, shape_bottom)
+            terms[shape] = terms.get(shape, 0) + a * b * delta ** loops
+
+    return terms
+
+
+def compose_terms(top, bottom):
+    """
+    Compose two mappings of shapes to coefficients (see `TL`) on the process
+    pool.
+    """
+
+    top = list(top.items())
+    bottom = list(bottom.items())
+
+    chunks = min(len(top), Parallel._workers * CHUNKS_PER_WORKER)
+    size = -(-len(top) // chunks)
+    mode_key = coefficients.get_mode().key
+    loop_value = coefficients.get_loop_value()
+    encoding = involution.get_shape_encoding()
+
+    futures = [_executor().submit(_compose_chunk, top[k:k + size], bottom, mode_key, loop_value, encoding)
+               for k in range(0, len(top), size)]
+
+    # Merge the partial results
+    terms = coefficients.get_mode().terms()
+
+    for future in futures:
+        for shape, coefficient in future.result().items():
+            terms[shape] = terms.get(shape, 0) + coefficient
+
+    return terms
@@ -36,25 +36,59 @@ The supported renderers are:
         >>> print(TL.U(3, 0) * TL.U(3, 1))
 
         1 * (+-++--)
+
+The coefficient free body of every shape is cached (per render mode), so
+rendering a diagram of a known shape only attaches its coefficient, e.g. when
+printing many elements with `render_batch`.
 """
 
+from collections import OrderedDict
+
 STRING_DIAGRAM = 0
 CROSSINGLESS_MATCHING = 1
 DYCK_PATH = 2
 
+# The default maximal number of cached bodies
+MAXSIZE = 1 << 12
+
 
 def set_render_mode(render_mode):
+    # The cached bodies belong to the previous render mode
+    if not render_mode == RenderMode._render_mode:
+        _cache.clear()
+
     RenderMode._render_mode = render_mode
 
 
 def render(diagram):
-    switch = {
-        0: string_diagram,
-        1: corssingless_matching,
-        2: dyck_path
-    }
+    body, attach = _switch[RenderMode._render_mode]
+
+    return attach(diagram._coefficient, _cache.body(diagram, body))
+
+
+def render_batch(elements):
+    """
+    Render many diagrams (or `TL`s) at once, drawing every shape among them
+    only once (unless there are more shapes than the cache can hold).
+    """
 
-    return switch[RenderMode._render_mode](diagram)
+    shapes = set()
+
+    for element in elements:
+        if hasattr(element, "_terms"):
+            shapes.update(element._terms)
+        else:
+            shapes.add(element.shape())
+
+    maxsize = _cache.maxsize
+
+    try:
+        if len(shapes) > maxsize:
+            _cache.resize(len(shapes))
+
+        return [str(element) for element in elements]
+    finally:
+        _cache.resize(maxsize)
 
 
 class RenderMode:
@@ -62,12 +96,101 @@ class RenderMode:
     _render_mode = STRING_DIAGRAM
 
 
+class RenderCache:
+    """
+    A least recently used cache of the coefficient free bodies of the shapes
+    rendered in the current render mode (see `Diagram.shape`).
+
+    Rendering a diagram of a cached shape only attaches the coefficient.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize=MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._bodies = OrderedDict()
+
+    def body(self, diagram, draw):
+        """
+        The body of the shape of `diagram`, drawn by `draw` if not cached.
+        """
+
+        shape = diagram.shape()
+        body = self._bodies.get(shape)
+
+        if body is not None:
+            self.hits += 1
+            self._bodies.move_to_end(shape)
+
+            return body
+
+        self.misses += 1
+        body = self._bodies[shape] = draw(diagram)
+
+        if len(self._bodies) > self.maxsize:
+            self._bodies.popitem(last=False)
+
+        return body
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+
+        while len(self._bodies) > maxsize:
+            self._bodies.popitem(last=False)
+
+    def clear(self):
+        self._bodies.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._bodies),
+            "maxsize": self.maxsize
+        }
+
+
+_cache = RenderCache()
+
+
+def set_cache_maxsize(maxsize):
+    _cache.resize(maxsize)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
+
+
 """
 Some dang ASCII art.
 """
 
 
 def string_diagram(diagram):
+    return _attach_string_diagram(diagram._coefficient, _string_diagram_body(diagram))
+
+
+def _attach_string_diagram(coefficient, body):
+    # The body is a list of lines, the coefficient goes in the vertical center
+    lines, center = body
+
+    coefficient = f"{coefficient} * "
+    left_offset = " " * len(coefficient)
+
+    return "\n".join((coefficient if i == center else left_offset) + line for i, line in enumerate(lines))
+
+
+def _string_diagram_body(diagram):
     n = diagram.n
 
     # There are numbers at the top and the bottom
@@ -75,10 +198,7 @@ def string_diagram(diagram):
     width = n + (n - 1)
     heigth = width
 
-    coefficient = f"{diagram._coefficient} * "
-    left_offset = "".join(" " for i in range(len(coefficient)))
-
-    string = left_offset + "".join(str(i) + " " if len(str(i)) == 1 else str(i) for i in range(diagram.n))
+    lines = ["".join(str(i) + " " if len(str(i)) == 1 else str(i) for i in range(diagram.n))]
 
     # A two dimensional grid of all the symbols to be placed
     symbols = [[" " for j in range(width)] for i in range(heigth)]
@@ -167,23 +287,24 @@ def string_diagram(diagram):
                 symbols[heigth - u - 1][2 * i + u + k] = "_"
 
     for i in range(heigth):
-        string += "\n"
+        lines.append("".join(symbols[i]))
 
-        # Draw the coefficient in the vertical center
-        if i == n - 1:
-            string += coefficient + "".join(symbols[i])
-        else:
-            string += left_offset + "".join(symbols[i])
+    lines.append("".join(str(i) + " " if len(str(i)) == 1 else str(i) for i in range(2 * diagram.n - 1, n - 1, -1)))
 
-    string += "\n"
+    # The coefficient is drawn in the vertical center, below the numbers
+    return lines, n
 
-    string += left_offset + "".join(str(i) + " " if len(str(i)) == 1 else str(i) for i in range(2 * diagram.n - 1, n - 1, -1))
 
-    return string
+def corssingless_matching(diagram):
+    return _attach_corssingless_matching(diagram._coefficient, _corssingless_matching_body(diagram))
 
 
-def corssingless_matching(diagram):
-    string = f"{diagram._coefficient} *\n  "
+def _attach_corssingless_matching(coefficient, body):
+    return f"{coefficient} *\n" + body
+
+
+def _corssingless_matching_body(diagram):
+    string = "  "
 
     string += "".join(str(i) + " " if len(str(i)) == 1 else str(i) for i in range(2 * diagram.n))
 
@@ -231,7 +352,15 @@ def corssingless_matching(diagram):
 
 
 def dyck_path(diagram):
-    string = f"{diagram._coefficient} * ("
+    return _attach_dyck_path(diagram._coefficient, _dyck_path_body(diagram))
+
+
+def _attach_dyck_path(coefficient, body):
+    return f"{coefficient} * " + body
+
+
+def _dyck_path_body(diagram):
+    string = "("
 
     # For each i in range(2 * n) we can have a + or -
     symbols = [None for i in range(2 * diagram.n)]
@@ -245,3 +374,11 @@ def dyck_path(diagram):
     string += "".join(symbols)
 
     return string + ")"
+
+
+# The body and the attaching of the coefficient of each render mode
+_switch = {
+    STRING_DIAGRAM: (_string_diagram_body, _attach_string_diagram),
+    CROSSINGLESS_MATCHING: (_corssingless_matching_body, _attach_corssingless_matching),
+    DYCK_PATH: (_dyck_path_body, _attach_dyck_path)
+}
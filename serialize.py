@@ -0,0 +1,357 @@
+"""
+This module contains the binary format of `TL` elements.
+
+A file consists of
+
+    a header
+        (see `HEADER`) with n, the number of terms, the kind of the
+        coefficients (see `RATIONAL`, `FLOAT` and `MODULAR`), the length of
+        the key and the prime of modular coefficients,
+
+    the key
+        an arbitrary byte string, e.g. what the element is (see `store`),
+
+    the ranks
+        of the diagrams of all terms (see `catalan`), as unsigned 64 bit
+        integers (so only elements of TL_n with n <= `MAX_N` can be written,
+        bigger n raise a `ValueError`),
+
+    the coefficients
+        either as doubles, as pairs of numerator and denominator in the
+        varint encoding (7 bits per byte, the numerator zigzag encoded), or as
+        residues in the varint encoding.
+
+The kind of the coefficients is taken from the element, not from the current
+coefficient mode.
+
+Files can be read completely, e.g.
+
+    >>> serialize.save(JW.get(8), "jw_8.tl")
+    >>> serialize.load("jw_8.tl") == JW.get(8)
+    True
+
+or mapped into memory and iterated lazily, without reading the whole file:
+
+    >>> with serialize.map_file("jw_8.tl") as element:
+    ...     for shape, coefficient in element:
+    ...         ...
+
+The coefficients are converted into the current coefficient mode (see
+`coefficients`) when read.
+Residues can only be read modulo the prime they were written with.
+"""
+
+from array import array
+from fractions import Fraction
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from . import catalan
+from . import coefficients
+from .tl import TL
+
+# magic, version, little endian, kind, n, number of terms, key length, prime
+HEADER = struct.Struct("=4sBBBHQIQ")
+MAGIC = b"TLEL"
+VERSION = 2
+
+# The kinds of coefficients
+RATIONAL = 0
+FLOAT = 1
+MODULAR = 2
+
+RANK_TYPECODE = "Q"
+
+# The biggest n for which all ranks, i.e. 0, ..., Catalan(n) - 1, fit into 64
+# bits
+MAX_N = 36
+FLOAT_TYPECODE = "d"
+
+
+def _write_varint(buffer, value):
+    # Seven bits per byte, the highest bit tells whether more bytes follow
+    while value > 0x7f:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    buffer.append(value)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+
+        if byte < 0x80:
+            return value, offset
+
+
+def _kind(values):
+    """
+    The kind of the coefficients `values` and the prime of residues (or 0).
+    """
+
+    modular = [value for value in values if isinstance(value, coefficients.ModInt)]
+
+    if modular:
+        p = modular[0].p
+
+        # Some idiot testing
+        if not len(modular) == len(values) or not all(value.p == p for value in modular):
+            raise ValueError(f"The coefficients must not mix residues modulo {p} with other scalars")
+
+        return MODULAR, p
+
+    if any(isinstance(value, float) for value in values):
+        return FLOAT, 0
+
+    return RATIONAL, 0
+
+
+def dumps(tl, key=b""):
+    """
+    The binary representation of `tl`, stored with `key`.
+    """
+
+    # Some idiot testing
+    if tl.n > MAX_N:
+        raise ValueError(f"Only elements of TL_n with n <= {MAX_N} can be written: {tl.n}")
+
+    items = list(tl._terms.items())
+    kind, p = _kind([coefficient for shape, coefficient in items])
+
+    ranks = array(RANK_TYPECODE, [catalan.rank_shape(shape) for shape, coefficient in items])
+
+    chunks = [HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", kind, tl.n, len(items), len(key), p),
+              key,
+              ranks.tobytes()]
+
+    if kind == FLOAT:
+        chunks.append(array(FLOAT_TYPECODE, [float(coefficient) for shape, coefficient in items]).tobytes())
+    elif kind == MODULAR:
+        varints = bytearray()
+
+        for shape, coefficient in items:
+            _write_varint(varints, coefficient.value)
+
+        chunks.append(varints)
+    else:
+        varints = bytearray()
+
+        for shape, coefficient in items:
+            numerator, denominator = coefficient.numerator, coefficient.denominator
+
+            # Zigzag, i.e. 0, -1, 1, -2, ... => 0, 1, 2, 3, ...
+            _write_varint(varints, 2 * numerator if numerator >= 0 else -2 * numerator - 1)
+            _write_varint(varints, denominator)
+
+        chunks.append(varints)
+
+    return b"".join(chunks)
+
+
+def save(tl, path, key=b""):
+    """
+    Write `tl` to the file at `path`.
+
+    The file is written to a temporary file first and then renamed, so
+    concurrent readers never see a partially written element.
+    """
+
+    data = dumps(tl, key)
+    file = tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(os.path.abspath(path)), prefix=".tl_", delete=False)
+
+    try:
+        with file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(file.name, path)
+    except BaseException:
+        os.unlink(file.name)
+        raise
+
+
+class MappedTL:
+    """
+    An element of TL_n in a file, read lazily.
+
+    `n: int`
+            The integer n in TL_n.
+
+    `key: bytes`
+            The key the element was stored with.
+
+    `_ranks: memoryview`
+            The ranks of the diagrams of all terms.
+
+    `kind: int`
+            The kind of the coefficients (see `RATIONAL`, `FLOAT` and
+            `MODULAR`).
+
+    `p: int`
+            The prime of modular coefficients (and 0 otherwise).
+
+    `_floats: memoryview`
+            The coefficients, if they are floats (and `None` otherwise).
+
+    `_offset: int`
+            Where the varint coefficients start, if they are no floats.
+    """
+
+    n: int
+    key: bytes
+    kind: int
+    p: int
+
+    def __init__(self, data, name="<bytes>", _mapping=None):
+        if len(data) < HEADER.size:
+            raise ValueError(f"Not a TL element: {name}")
+
+        magic, version, little_endian, kind, n, size, key_length, p = HEADER.unpack_from(data)
+
+        if not magic == MAGIC or not version == VERSION:
+            raise ValueError(f"Not a TL element (version {VERSION}): {name}")
+
+        if not little_endian == (sys.byteorder == "little"):
+            raise ValueError(f"The TL element has the wrong byte order: {name}")
+
+        if n > MAX_N:
+            raise ValueError(f"The TL element is too big (n > {MAX_N}): {name}")
+
+        if not kind in (RATIONAL, FLOAT, MODULAR):
+            raise ValueError(f"The TL element has coefficients of an unknown kind: {name}")
+
+        view = memoryview(data)
+        offset = HEADER.size + key_length
+        ranks_end = offset + array(RANK_TYPECODE).itemsize * size
+
+        if len(data) < ranks_end:
+            raise ValueError(f"The TL element is truncated: {name}")
+
+        self.n = n
+        self.key = bytes(view[HEADER.size:offset])
+        self.kind = kind
+        self.p = p
+        self._ranks = view[offset:ranks_end].cast(RANK_TYPECODE)
+        self._floats = None
+        self._offset = ranks_end
+        self._data = view
+
+        if kind == FLOAT:
+            floats_end = ranks_end + array(FLOAT_TYPECODE).itemsize * size
+
+            if not len(data) == floats_end:
+                raise ValueError(f"The TL element is truncated: {name}")
+
+            self._floats = view[ranks_end:floats_end].cast(FLOAT_TYPECODE)
+
+        # Keep the mapped file open as long as the element lives
+        self._mapping = _mapping
+
+    def __len__(self):
+        return len(self._ranks)
+
+    def __iter__(self):
+        """
+        The terms as pairs of shape and coefficient, in the current
+        coefficient mode.
+
+        Raises a `ValueError` if residues are read in a mode other than the
+        one modulo their prime.
+        """
+
+        mode = coefficients.get_mode()
+        convert = mode.convert
+
+        if self.kind == MODULAR and not (isinstance(mode, coefficients.Modular) and mode.p == self.p):
+            raise ValueError(f"Residues modulo {self.p} can only be read in the coefficient mode `mod {self.p}`: `{mode.key}`")
+
+        if self._floats is not None:
+            for rank, value in zip(self._ranks, self._floats):
+                yield catalan.unrank_shape(self.n, rank), convert(value)
+
+            return
+
+        data = self._data
+        offset = self._offset
+
+        if self.kind == MODULAR:
+            for rank in self._ranks:
+                value, offset = _read_varint(data, offset)
+                yield catalan.unrank_shape(self.n, rank), convert(value)
+
+            return
+
+        for rank in self._ranks:
+            zigzag, offset = _read_varint(data, offset)
+            denominator, offset = _read_varint(data, offset)
+            numerator = zigzag >> 1 if zigzag % 2 == 0 else -(zigzag + 1 >> 1)
+
+            value = numerator if denominator == 1 else Fraction(numerator, denominator)
+            yield catalan.unrank_shape(self.n, rank), convert(value)
+
+    def to_tl(self):
+        """
+        Read all terms into a `TL`.
+        """
+
+        terms = coefficients.get_mode().terms()
+
+        for shape, coefficient in self:
+            terms[shape] = coefficient
+
+        return TL._from_terms(self.n, terms)
+
+    def close(self):
+        self._ranks.release()
+
+        if self._floats is not None:
+            self._floats.release()
+
+        self._data.release()
+
+        if self._mapping is not None:
+            self._mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def loads(data):
+    """
+    Read an element from its binary representation.
+    """
+
+    return MappedTL(data).to_tl()
+
+
+def map_file(path):
+    """
+    Map the element in the file at `path` into memory.
+    """
+
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return MappedTL(mapping, path, _mapping=mapping)
+
+
+def load(path):
+    """
+    Read the element in the file at `path`.
+    """
+
+    with map_file(path) as element:
+        return element.to_tl()
@@ -0,0 +1,176 @@
+"""
+This module contains an optional NumPy backend for `TL.compose`.
+
+An element of TL_n is a sparse vector over the basis of TL_n: the ranks of
+its diagrams (see `catalan`) and an array of their coefficients.
+Composing two such vectors is a batched gather from a structure constant
+table (see `tables`) followed by one vectorized accumulation, instead of a
+Python loop over all pairs of diagrams.
+
+The backend is used by `TL.compose` once it is enabled, NumPy is installed
+and a table for TL_n is registered, e.g.
+
+    >>> tables.register(tables.load("tl_8.table"))
+    >>> sparse.set_enabled(True)
+    >>> JW.get(8)
+
+Otherwise `TL.compose` falls back to the pure Python path.
+"""
+
+from . import catalan
+from . import coefficients
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The number of pairs of diagrams handled in one vectorized step
+CHUNK_SIZE = 1 << 20
+
+
+class Backend:
+    # Off by default
+    _enabled = False
+
+
+def available():
+    return numpy is not None
+
+
+def set_enabled(enabled):
+    Backend._enabled = enabled
+
+
+def enabled():
+    return Backend._enabled and numpy is not None
+
+
+def _dtype(coefficients):
+    # Unboxed floats if possible, exact Python objects otherwise
+    if all(isinstance(coefficient, float) for coefficient in coefficients):
+        return numpy.float64
+
+    return object
+
+
+class SparseTL:
+    """
+    An element of TL_n as a sparse vector.
+
+    `n: int`
+            The integer n in TL_n.
+
+    `indices`:
+            A NumPy array of the ranks of the diagrams.
+
+    `coefficients`:
+            A NumPy array of the corresponding coefficients.
+    """
+
+    n: int
+
+    def __init__(self, n, indices, coefficients):
+        if numpy is None:
+            raise ImportError("The sparse backend needs NumPy")
+
+        if not len(indices) == len(coefficients):
+            raise ValueError(f"`indices` and `coefficients` must have the same length: {len(indices)}, {len(coefficients)}")
+
+        self.n = n
+        self.indices = indices
+        self.coefficients = coefficients
+
+    def from_terms(n, terms):
+        """
+        Convert a mapping of shapes to coefficients in TL_n (see `TL`).
+        """
+
+        if numpy is None:
+            raise ImportError("The sparse backend needs NumPy")
+
+        values = list(terms.values())
+
+        indices = numpy.fromiter((catalan.rank_shape(shape) for shape in terms), dtype=numpy.int64, count=len(values))
+        coefficients = numpy.empty(len(values), dtype=_dtype(values))
+        coefficients[:] = values
+
+        return SparseTL(n, indices, coefficients)
+
+    def to_terms(self, table):
+        """
+        Convert back to a mapping of shapes to coefficients, dropping all
+        zeros.
+        """
+
+        return {table.shape(index): coefficient
+                for index, coefficient in zip(self.indices.tolist(), self.coefficients.tolist())
+                if not coefficient == 0}
+
+    def compose(self, other, table):
+        """
+        This takes `self` and stacks it on top of `other`, using the structure
+        constants in `table`.
+        """
+
+        size = table.size
+        results = numpy.frombuffer(table._results, dtype=f"u{table._results.itemsize}")
+        loops = numpy.frombuffer(table._loops, dtype=f"u{table._loops.itemsize}")
+
+        dtype = numpy.float64 if (self.coefficients.dtype == numpy.float64 and
+                                  other.coefficients.dtype == numpy.float64) else object
+
+        factors = numpy.empty(self.n + 1, dtype=dtype)
+        delta = coefficients.delta()
+        factors[:] = [delta ** k for k in range(self.n + 1)]
+
+        if not len(self.indices) or not len(other.indices):
+            return SparseTL(self.n, numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=dtype))
+
+        columns = other.indices
+        rows_per_chunk = max(1, CHUNK_SIZE // max(1, len(columns)))
+
+        partial_indices = []
+        partial_coefficients = []
+
+        for start in range(0, len(self.indices), rows_per_chunk):
+            rows = self.indices[start:start + rows_per_chunk] * size
+            k = (rows[:, None] + columns[None, :]).ravel()
+
+            products = numpy.multiply.outer(self.coefficients[start:start + rows_per_chunk], other.coefficients).ravel()
+            products = products.astype(dtype, copy=False) * factors[loops[k]]
+
+            indices, sums = _accumulate(results[k], products)
+            partial_indices.append(indices)
+            partial_coefficients.append(sums)
+
+        indices, sums = _accumulate(numpy.concatenate(partial_indices), numpy.concatenate(partial_coefficients))
+
+        return SparseTL(self.n, indices.astype(numpy.int64), sums)
+
+
+def _accumulate(indices, coefficients):
+    """
+    Sum up the coefficients of equal indices.
+
+    Returns the sorted distinct indices and their sums.
+    """
+
+    order = numpy.argsort(indices, kind="stable")
+    indices = indices[order]
+    coefficients = coefficients[order]
+
+    starts = numpy.flatnonzero(numpy.concatenate(([True], indices[1:] != indices[:-1])))
+
+    return indices[starts], numpy.add.reduceat(coefficients, starts)
+
+
+def compose_terms(table, top, bottom):
+    """
+    Like `StructureTable.compose_terms`, but vectorized.
+    """
+
+    a = SparseTL.from_terms(table.n, top)
+    b = SparseTL.from_terms(table.n, bottom)
+
+    return a.compose(b, table).to_terms(table)
@@ -0,0 +1,89 @@
+"""
+This module contains the (opt-in) persistent store of Jones-Wenzl projectors.
+
+Once a directory is set, `JW.get` looks projectors up in memory, then in the
+directory and only then calculates them, saving every calculated projector
+for later runs (and other processes), e.g.
+
+    >>> store.set_directory("jw_store")
+    >>> JW.get(10)
+
+Projectors are stored per n, coefficient mode and loop value (see
+`coefficients`), one file each, in the format of `serialize` with the key
+they were stored under.
+Files are written to a temporary file first and then renamed, so concurrent
+processes sharing one directory never see partially written projectors.
+"""
+
+import os
+import re
+from . import coefficients
+from . import serialize
+
+
+class Store:
+    # No persistent store by default
+    _directory = None
+
+
+def set_directory(directory):
+    """
+    Store projectors in `directory` (created if necessary), or nowhere if it
+    is `None`.
+    """
+
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+
+    Store._directory = directory
+
+
+def get_directory():
+    return Store._directory
+
+
+def _key(n):
+    # The key of JW_n in the current coefficient mode and loop value
+    return f"{n} {coefficients.get_mode().key} {coefficients.get_loop_value()}"
+
+
+def path(n, directory=None):
+    """
+    The file of JW_n in the current coefficient mode and loop value, in
+    `directory` (by default the one of the store).
+    """
+
+    if directory is None:
+        directory = Store._directory
+
+    name = re.sub(r"[^0-9A-Za-z.-]", "_", _key(n))
+
+    return os.path.join(directory, f"jw_{name}.bin")
+
+
+def save(n, jw, directory=None):
+    """
+    Write JW_n (i.e. `jw`) to the store (or to `directory`).
+    """
+
+    serialize.save(jw, path(n, directory), _key(n).encode())
+
+
+def load(n, directory=None):
+    """
+    Read JW_n from the store (or from `directory`), or return `None` if it is
+    not stored.
+    """
+
+    file_path = path(n, directory)
+
+    try:
+        element = serialize.map_file(file_path)
+    except FileNotFoundError:
+        return None
+
+    with element:
+        if not element.key == _key(n).encode() or not element.n == n:
+            raise ValueError(f"The stored projector belongs to another key: {element.key.decode()}, {_key(n)}")
+
+        return element.to_tl()
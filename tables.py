@@ -0,0 +1,220 @@
+"""
+This module contains the (opt-in) structure constant tables of TL_n.
+
+For a fixed n, the composition of the basis diagrams of rank a and b (see
+`catalan`) is a single basis diagram of rank `results[a * size + b]` times
+delta to the power of `loops[a * size + b]`, where size == Catalan(n).
+Once a table for TL_n is registered, `TL.compose` looks products up instead
+of running through the strings, e.g.
+
+    >>> table = tables.build(8)
+    >>> tables.save(table, "tl_8.table")
+
+and in every later run
+
+    >>> tables.register(tables.load("tl_8.table"))
+
+Table files consist of a header followed by both arrays in native byte order,
+so loading a table is a single `mmap` without any parsing.
+"""
+
+from array import array
+import mmap
+import struct
+import sys
+from . import catalan
+from . import coefficients
+from . import involution
+
+# magic, version, little endian, n, size
+HEADER = struct.Struct("=4sBBHQ")
+MAGIC = b"TLST"
+VERSION = 1
+
+RESULT_TYPECODE = "I"
+LOOP_TYPECODE = "B"
+
+
+class StructureTable:
+    """
+    The multiplication table of the basis diagrams of TL_n.
+
+    `n: int`
+            The integer n in TL_n.
+
+    `size: int`
+            The number of basis diagrams, i.e. Catalan(n).
+
+    `_results`:
+            The ranks of the products, row by row (an `array` or a
+            `memoryview` of a mapped file).
+
+    `_loops`:
+            The number of closed loops of the products, row by row.
+
+    `_shapes: dict`
+            The shapes of all ranks which have been looked up so far.
+    """
+
+    n: int
+    size: int
+    _shapes: dict
+
+    def __init__(self, n, results, loops, _mapping=None):
+        self.n = n
+        self.size = catalan.catalan(n)
+
+        if not len(results) == len(loops) == self.size * self.size:
+            raise ValueError(f"`results` and `loops` must have Catalan(n)^2 entries: {len(results)}, {len(loops)}, {n}")
+
+        self._results = results
+        self._loops = loops
+        self._shapes = {}
+
+        # Keep the mapped file open as long as the table lives
+        self._mapping = _mapping
+
+    def lookup(self, a, b):
+        """
+        The rank of the product of the basis diagrams of rank `a` and `b` and
+        its number of closed loops.
+        """
+
+        k = a * self.size + b
+
+        return self._results[k], self._loops[k]
+
+    def shape(self, index):
+        """
+        The shape of the basis diagram of rank `index`.
+        """
+
+        # The shapes of both encodings (see `involution`) are remembered apart
+        key = (involution.get_shape_encoding(), index)
+        shape = self._shapes.get(key)
+
+        if shape is None:
+            shape = self._shapes[key] = catalan.unrank_shape(self.n, index)
+
+        return shape
+
+    def compose_terms(self, top, bottom):
+        """
+        Compose two mappings of shapes to coefficients in TL_n (see `TL`).
+        """
+
+        size = self.size
+        results = self._results
+        loops = self._loops
+        delta = coefficients.delta()
+        factors = [delta ** k for k in range(self.n + 1)]
+
+        rows = [(catalan.rank_shape(shape) * size, a) for shape, a in top.items()]
+        columns = [(catalan.rank_shape(shape), b) for shape, b in bottom.items()]
+
+        products = {}
+
+        for row, a in rows:
+            for column, b in columns:
+                k = row + column
+                index = results[k]
+                products[index] = products.get(index, 0) + a * b * factors[loops[k]]
+
+        return {self.shape(index): coefficient for index, coefficient in products.items()}
+
+
+def build(n):
+    """
+    Compute the structure constant table of TL_n.
+
+    This takes Catalan(n)^2 compositions, so it is meant to be done once and
+    saved (see `save`).
+    """
+
+    size = catalan.catalan(n)
+
+    results = array(RESULT_TYPECODE, bytes(array(RESULT_TYPECODE).itemsize * size * size))
+    loops = array(LOOP_TYPECODE, bytes(size * size))
+
+    basis = [catalan.unrank_partners(n, index) for index in range(size)]
+
+    k = 0
+
+    for top in basis:
+        for bottom in basis:
+            partners, closed = involution.compose(top, bottom, n)
+            results[k] = catalan.rank_partners(partners, n)
+            loops[k] = closed
+            k += 1
+
+    return StructureTable(n, results, loops)
+
+
+def save(table, path):
+    """
+    Write `table` to the file at `path`.
+    """
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", table.n, table.size))
+        file.write(memoryview(table._results).cast("B"))
+        file.write(memoryview(table._loops).cast("B"))
+
+
+def load(path):
+    """
+    Map the table in the file at `path` into memory.
+    """
+
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapping) < HEADER.size:
+        raise ValueError(f"Not a structure constant table: {path}")
+
+    magic, version, little_endian, n, size = HEADER.unpack_from(mapping)
+
+    if not magic == MAGIC or not version == VERSION:
+        raise ValueError(f"Not a structure constant table (version {VERSION}): {path}")
+
+    if not little_endian == (sys.byteorder == "little"):
+        raise ValueError(f"The structure constant table has the wrong byte order: {path}")
+
+    results_size = array(RESULT_TYPECODE).itemsize * size * size
+    loops_size = array(LOOP_TYPECODE).itemsize * size * size
+
+    if not len(mapping) == HEADER.size + results_size + loops_size:
+        raise ValueError(f"The structure constant table is truncated: {path}")
+
+    view = memoryview(mapping)
+    results = view[HEADER.size:HEADER.size + results_size].cast(RESULT_TYPECODE)
+    loops = view[HEADER.size + results_size:].cast(LOOP_TYPECODE)
+
+    return StructureTable(n, results, loops, _mapping=mapping)
+
+
+_registry = {}
+
+
+def register(table):
+    """
+    Let `TL.compose` use `table` for all elements of TL_n.
+    """
+
+    _registry[table.n] = table
+
+
+def unregister(n):
+    """
+    Stop using a table for TL_n.
+    """
+
+    _registry.pop(n, None)
+
+
+def get(n):
+    """
+    The registered table for TL_n (or `None`).
+    """
+
+    return _registry.get(n)
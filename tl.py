@@ -1,5 +1,13 @@
-import logging
 from fractions import Fraction
+import heapq
+import io
+from itertools import islice
+from . import cache
+from . import coefficients
+from . import involution
+from . import parallel
+from . import sparse
+from . import tables
 from .diagram import Diagram
 
 
@@ -10,12 +18,15 @@ class TL:
     `n: int`
             The integer n in TL_n and in 'crossingles matching on 2n vertices'.
 
-    `_diagrams`:
-            A list of diagrams representing the linear combiniation.
+    `_terms: dict`
+            The linear combiniation as a mapping from the shape of each
+            diagram (see `Diagram.shape`) to its coefficient.
+            The coefficient mode (see `coefficients`) decides which kind of
+            mapping is used, e.g. one storing floats unboxed.
     """
 
     n: int
-    _diagrams: list
+    _terms: dict
 
     def __init__(self, diagrams: list = [Diagram.id(2)]):
         # Some idiot testing
@@ -26,7 +37,31 @@ class TL:
             raise ValueError(f"`diagrams` must be a non-empty list of diagrams for the same n: {diagrams}")
 
         self.n = diagrams[0].n
-        self._diagrams = diagrams
+        self._terms = coefficients.get_mode().terms()
+
+        for diagram in diagrams:
+            shape = diagram.shape()
+            self._terms[shape] = self._terms.get(shape, 0) + diagram._coefficient
+
+    def _from_terms(n, terms):
+        """
+        Build an element straight from a mapping of shapes to coefficients,
+        skipping all checks.
+        """
+
+        tl = TL.__new__(TL)
+        tl.n = n
+        tl._terms = terms
+
+        return tl
+
+    @property
+    def _diagrams(self):
+        """
+        A list of diagrams representing the linear combiniation.
+        """
+
+        return [Diagram._from_shape(shape, coefficient) for shape, coefficient in self._terms.items()]
 
     def id(n):
         return TL([Diagram.id(n)])
@@ -37,76 +72,442 @@ class TL:
     def compose(self, tl):
         """
         This takes `self` and stacks it on top of `tl`.
+
+        If one side is a single generator c * U_i, only the two strings it
+        touches are rewired (see `left_mul_U` and `right_mul_U`).
+        Otherwise, if a structure constant table for TL_n is registered (see
+        `tables`), the products of the diagrams are looked up in it
+        (vectorized, if the sparse backend is enabled, see `sparse`).
+        Otherwise they are looked up in (and added to) the composition cache
+        (see `cache`), on a process pool for big products (see `parallel`).
+        """
+
+        # Multiplying by a single generator U_i only rewires two strings
+        generator = tl._generator()
+
+        if generator is not None:
+            return self._mul_U(involution.right_mul_U, *generator)
+
+        generator = self._generator()
+
+        if generator is not None:
+            return tl._mul_U(involution.left_mul_U, *generator)
+
+        terms = self._compose_terms(tl)
+
+        if terms is None:
+            terms = self._compose_into(tl, coefficients.get_mode().terms())
+
+        return TL._from_terms(self.n, terms).condense_diagrams()
+
+    def compose_chain(elements):
+        """
+        Stack all `elements` (of the same TL_n) on top of each other, the
+        first at the top.
+
+        Every run of single diagrams among them (e.g. a word in the generators
+        U_i) is composed in a single pass (see `involution.compose_chain`),
+        without intermediate elements or condensing.
+        The rest is composed one by one.
+        """
+
+        elements = list(elements)
+
+        # Some idiot testing
+        if (not elements or
+            not all(isinstance(element, TL) for element in elements) or
+            not all(element.n == elements[0].n for element in elements)):
+            raise ValueError(f"`elements` must be a non-empty list of elements of the same TL_n: {elements}")
+
+        n = elements[0].n
+        delta = coefficients.delta()
+        factors = []
+        run = []
+
+        # Collapse runs of single diagrams, so only the others are multiplied
+        for element in elements + [None]:
+            if element is not None and len(element._terms) == 1:
+                run.append(element)
+                continue
+
+            if len(run) == 1:
+                factors.append(run[0])
+            elif run:
+                shape, loops = involution.compose_chain_shapes([next(iter(single._terms)) for single in run])
+                coefficient = 1
+
+                for single in run:
+                    coefficient = coefficient * next(iter(single._terms.values()))
+
+                terms = coefficients.get_mode().terms()
+                terms[shape] = coefficient * delta ** loops
+                factors.append(TL._from_terms(n, terms).condense_diagrams())
+
+            run = []
+
+            if element is not None:
+                factors.append(element)
+
+        product = factors[0]
+
+        for factor in factors[1:]:
+            product = product.compose(factor)
+
+        return product
+
+    def _generator(self):
+        """
+        The i and the coefficient c if `self` is c * U_i (or `None`).
+        """
+
+        if not len(self._terms) == 1:
+            return None
+
+        for shape, coefficient in self._terms.items():
+            i = involution.generator_index(shape)
+
+            return None if i is None else (i, coefficient)
+
+    def _mul_U(self, multiply, i, scalar=1, memo=None):
+        # `scalar` * U_i * `self` or `scalar` * `self` * U_i, depending on
+        # `multiply` (see `involution.left_mul_U` and `involution.right_mul_U`)
+        if not 0 <= i < self.n - 1:
+            raise ValueError(f"`i` must be less than `n`-1 for U_i to exist in TL_n: {i}, {self.n}")
+
+        if memo is None:
+            memo = {}
+
+        terms = coefficients.get_mode().terms()
+        delta = coefficients.delta()
+
+        for shape, coefficient in self._terms.items():
+            product = memo.get(shape)
+
+            if product is None:
+                product = memo[shape] = multiply(shape, i)
+
+            shape, loops = product
+            coefficient = scalar * coefficient
+
+            if loops:
+                coefficient = coefficient * delta
+
+            terms[shape] = terms.get(shape, 0) + coefficient
+
+        return TL._from_terms(self.n, terms).condense_diagrams()
+
+    def left_mul_U(self, i):
+        """
+        U_i * `self`, rewiring only the strings at the top vertices i and
+        i + 1 of every diagram.
+        """
+
+        return self._mul_U(involution.left_mul_U, i)
+
+    def right_mul_U(self, i):
+        """
+        `self` * U_i, rewiring only the strings at the bottom vertices below
+        the columns i and i + 1 of every diagram.
+        """
+
+        return self._mul_U(involution.right_mul_U, i)
+
+    def left_mul_U_batch(elements, i):
+        """
+        U_i * a for all elements a (of the same TL_n), rewiring every shape
+        among them only once.
+        """
+
+        memo = {}
+
+        return [element._mul_U(involution.left_mul_U, i, memo=memo) for element in elements]
+
+    def right_mul_U_batch(elements, i):
+        """
+        a * U_i for all elements a (of the same TL_n), rewiring every shape
+        among them only once.
+        """
+
+        memo = {}
+
+        return [element._mul_U(involution.right_mul_U, i, memo=memo) for element in elements]
+
+    def _compose_terms(self, tl):
+        """
+        The terms of `self` * `tl` from a structure constant table or the
+        process pool, or `None` if neither applies.
+        """
+
+        table = tables.get(self.n)
+
+        if table is not None:
+            if sparse.enabled():
+                return sparse.compose_terms(table, self._terms, tl._terms)
+
+            return table.compose_terms(self._terms, tl._terms)
+
+        if parallel.applies(len(self._terms) * len(tl._terms)):
+            return parallel.compose_terms(self._terms, tl._terms)
+
+        return None
+
+    def _compose_into(self, tl, terms, scalar=1):
         """
+        Add `scalar` * `self` * `tl` to the mapping `terms` of shapes to
+        coefficients, without condensing.
+        """
+
+        products = self._compose_terms(tl)
+
+        if products is not None:
+            for shape, coefficient in products.items():
+                terms[shape] = terms.get(shape, 0) + scalar * coefficient
 
-        return TL([a * b for a in self._diagrams for b in tl._diagrams]).condense_diagrams()
+            return terms
+
+        delta = coefficients.delta()
+
+        for top, a in self._terms.items():
+            a = scalar * a
+
+            for bottom, b in tl._terms.items():
+                shape, loops = cache.compose_shapes(top, bottom)
+                terms[shape] = terms.get(shape, 0) + a * b * delta ** loops
+
+        return terms
 
     def tensor(self, tl):
         """
         This takes `self` and puts it to the left of `other`.
         """
 
-        return TL([a & b for a in self._diagrams for b in tl._diagrams]).condense_diagrams()
+        # Adding strands going straight down needs no tensor products
+        if len(tl._terms) == 1 and tl._terms.get(Diagram.id(tl.n).shape()) == 1:
+            return self.extend(tl.n)
+
+        terms = coefficients.get_mode().terms()
+
+        for left, a in self._terms.items():
+            for right, b in tl._terms.items():
+                shape = involution.tensor_shapes(left, right)
+                terms[shape] = terms.get(shape, 0) + a * b
+
+        return TL._from_terms(self.n + tl.n, terms).condense_diagrams()
+
+    def trace(self):
+        """
+        The Markov trace (see `Diagram.trace`).
+
+        The coefficients are summed by the number of loops first, so the loop
+        value is raised to every power only once.
+        """
+
+        sums = {}
+
+        for shape, coefficient in self._terms.items():
+            loops = involution.trace(involution.view(shape), self.n)
+            sums[loops] = sums.get(loops, 0) + coefficient
+
+        delta = coefficients.delta()
+
+        return sum(coefficient * delta ** loops for loops, coefficient in sums.items())
+
+    def partial_trace(self, k):
+        """
+        Close the k rightmost strands of every diagram (see
+        `Diagram.partial_trace`), giving an element of TL_(n - k).
+
+        The coefficients are summed by the resulting shape and the number of
+        loops first, so the loop value is raised to every power only once.
+        """
+
+        # Some idiot testing
+        if not isinstance(k, int) or not 0 <= k < self.n:
+            raise ValueError(f"`k` must be an integer with 0 <= k < `n` to leave strands open in TL_n: {k}, {self.n}")
+
+        sums = {}
+
+        for shape, coefficient in self._terms.items():
+            key = involution.partial_trace_shapes(shape, k)
+            sums[key] = sums.get(key, 0) + coefficient
+
+        terms = coefficients.get_mode().terms()
+        powers = {}
+        delta = coefficients.delta()
+
+        for (shape, loops), coefficient in sums.items():
+            if loops:
+                power = powers.get(loops)
+
+                if power is None:
+                    power = powers[loops] = delta ** loops
+
+                coefficient = coefficient * power
+
+            terms[shape] = terms.get(shape, 0) + coefficient
+
+        return TL._from_terms(self.n - k, terms).condense_diagrams()
+
+    def extend(self, k=1):
+        """
+        `self` & id_k, i.e. k strands going straight down added to the right
+        of every diagram, as an element of TL_(n + k).
+
+        Adding strands never merges two diagrams or changes a coefficient, so
+        the terms are only rekeyed (see `involution.add_through_strands`),
+        without composing or condensing.
+        """
+
+        # Some idiot testing
+        if not isinstance(k, int) or k < 0:
+            raise ValueError(f"`k` must be a non-negative integer: {k}")
+
+        n = self.n
+        strands = involution.through_strands(n, k)
+
+        def extend(shape):
+            return involution.to_shape(involution.add_through_strands(involution.view(shape), n, k, strands))
+
+        if type(self._terms) is dict:
+            terms = {extend(shape): coefficient for shape, coefficient in self._terms.items()}
+        else:
+            terms = self._terms.rekey(extend)
+
+        return TL._from_terms(n + k, terms)
+
+    add_through_strands = extend
 
     def condense_diagrams(self):
-        diagrams = self._diagrams.copy()
-        condensed_diagrams = []
+        """
+        Drop all diagrams with coefficient 0.
 
-        while diagrams:
-            diagram = diagrams.pop(0)  # to keep the order
+        Diagrams of the same shape are merged as soon as they are added, so
+        there is nothing else to do.
+        """
 
-            # `.copy()` is necessary because of `remove` in iteration
-            for other in diagrams.copy():
-                if diagram._has_same_diagram_as(other):
-                    diagram += other
-                    diagrams.remove(other)
+        terms = coefficients.get_mode().terms()
 
-            if not diagram == 0:
-                condensed_diagrams.append(diagram)
+        for shape, coefficient in self._terms.items():
+            if not coefficient == 0:
+                terms[shape] = coefficient
 
-        return TL(condensed_diagrams)
+        return TL._from_terms(self.n, terms)
 
     def __eq__(self, other):
-        # self subset of other
-        for diagram in self._diagrams:
-            # Using `diagram in other._diagrams` is not possible
-            if any(diagram._has_same_diagram_as(d) for d in other._diagrams):
-                continue
-            else:
-                logging.info(f"{repr(self)} is not euqal to {repr(other)} because of {repr(diagram)} in {repr(self)}")
-                return False
-
-        # self superset of other
-        for diagram in other._diagrams:
-            # Using `diagram in self._diagrams` is not possible
-            if any(diagram._has_same_diagram_as(d) for d in self._diagrams):
-                continue
-            else:
-                logging.info(f"{repr(self)} is not euqal to {repr(other)} because of {repr(diagram)} in {repr(other)}")
-                return False
+        # If there is a check against 0
+        if isinstance(other, int) or isinstance(other, Fraction):
+            return other == 0 and not self.condense_diagrams()._terms
 
-        return True
+        return (self.n == other.n and
+                self.condense_diagrams()._terms == other.condense_diagrams()._terms)
 
     def __and__(self, other):
+        # Let e.g. lazy expressions (see `lazy`) handle other operands
+        if not isinstance(other, TL):
+            return NotImplemented
+
         return self.tensor(other)
 
     __matmul__ = __and__
 
     def __mul__(self, other):
         # TL * other
-        # => other is TL
+        # => other is TL (or e.g. a lazy expression)
+        if not isinstance(other, TL):
+            return NotImplemented
+
         return self.compose(other)
 
     def __rmul__(self, other):
         # other * TL
         # and other is not TL (because __mul__ wans't called)
         # => other is scalar
-        return TL([other * diagram for diagram in self._diagrams])
+        terms = coefficients.get_mode().terms()
+
+        for shape, coefficient in self._terms.items():
+            terms[shape] = other * coefficient
+
+        return TL._from_terms(self.n, terms)
 
     def __add__(self, other):
         # TL + other
-        # => other is TL
-        return TL(self._diagrams + other._diagrams).condense_diagrams()
+        # => other is TL (or e.g. a lazy expression)
+        if not isinstance(other, TL):
+            return NotImplemented
+
+        terms = self._terms.copy()
+
+        for shape, coefficient in other._terms.items():
+            terms[shape] = terms.get(shape, 0) + coefficient
+
+        return TL._from_terms(self.n, terms).condense_diagrams()
+
+    def copy(self):
+        return TL._from_terms(self.n, self._terms.copy())
+
+    def axpy(self, scalar, tl):
+        """
+        Add `scalar` * `tl` to `self` in place, dropping coefficients as soon
+        as they become 0, and return `self`.
+
+        This changes `self`, so copy shared elements (e.g. from `JW.get`)
+        first.
+        Unlike `axpy`, `+=` never changes an element, it binds a new one.
+        """
+
+        # Some idiot testing
+        if not isinstance(tl, TL) or not tl.n == self.n:
+            raise ValueError(f"`tl` must be an element of TL_{self.n}: {tl}")
+
+        terms = self._terms
+        items = tl._terms.items()
+
+        # Terms are dropped while iterating, so `self.axpy(scalar, self)` has
+        # to iterate over a copy
+        if tl is self:
+            items = list(items)
+
+        for shape, coefficient in items:
+            if not scalar == 1:
+                coefficient = scalar * coefficient
+
+            coefficient = terms.get(shape, 0) + coefficient
+
+            if coefficient == 0:
+                terms.pop(shape, None)
+            else:
+                terms[shape] = coefficient
+
+        return self
+
+    def sum(elements, scalars=None):
+        """
+        The linear combination of `elements` with `scalars` (by default the
+        sum), accumulated in place in time linear in the number of terms.
+
+        Unlike `sum(elements)`, this does not copy the partial sums.
+        """
+
+        elements = list(elements)
+
+        # Some idiot testing
+        if not elements:
+            raise ValueError("`elements` must not be empty")
+
+        if scalars is None:
+            scalars = [1 for element in elements]
+
+        scalars = list(scalars)
+
+        if not len(scalars) == len(elements):
+            raise ValueError(f"`scalars` must have one scalar for each element: {len(scalars)}, {len(elements)}")
+
+        total = TL._from_terms(elements[0].n, coefficients.get_mode().terms())
+
+        for scalar, element in zip(scalars, elements):
+            total.axpy(scalar, element)
+
+        return total
 
     def __radd__(self, other):
         # other + TL
@@ -114,12 +515,92 @@ class TL:
         # => other is 0 (called by `sum`)
         return self
 
+    def _magnitude(coefficient):
+        # What terms are ordered by, residues by their representative
+        if isinstance(coefficient, coefficients.ModInt):
+            return coefficient.value
+
+        return abs(coefficient)
+
+    def _select_terms(self, limit=None, by_magnitude=False):
+        """
+        The (first `limit`) terms, biggest coefficients first if
+        `by_magnitude`.
+        """
+
+        terms = self._terms.items()
+
+        if by_magnitude:
+            key = lambda term: TL._magnitude(term[1])
+
+            if limit is None:
+                terms = sorted(terms, key=key, reverse=True)
+            else:
+                terms = heapq.nlargest(limit, terms, key=key)
+
+        return islice(terms, limit)
+
+    def render_terms(self, limit=None, by_magnitude=False):
+        """
+        Lazily render the terms one at a time (see `renderer`).
+        """
+
+        for shape, coefficient in self._select_terms(limit, by_magnitude):
+            yield str(Diagram._from_shape(shape, coefficient))
+
+    def summary(self):
+        """
+        A single line describing the element, without rendering any terms.
+        """
+
+        if not self._terms:
+            return f"TL_{self.n}: 0 terms"
+
+        # In a single pass, without holding all magnitudes at once
+        smallest = largest = None
+
+        for coefficient in self._terms.values():
+            magnitude = TL._magnitude(coefficient)
+
+            if smallest is None or magnitude < smallest:
+                smallest = magnitude
+
+            if largest is None or magnitude > largest:
+                largest = magnitude
+
+        return f"TL_{self.n}: {len(self._terms)} terms, coefficients of magnitude {smallest} to {largest}"
+
+    def write(self, file, limit=None, by_magnitude=False, summary=False):
+        """
+        Write the element to the file-like object `file`, one term at a time.
+
+        Only the first `limit` terms are written (biggest coefficients first if
+        `by_magnitude`), and only the summary (see `summary`) if `summary`.
+        """
+
+        if summary:
+            file.write(self.summary() + "\n")
+
+            return
+
+        file.write("\n")
+
+        for k, string in enumerate(self.render_terms(limit, by_magnitude)):
+            if k:
+                file.write("\n +\n")
+
+            file.write(string)
+
+        if limit is not None and len(self._terms) > limit:
+            file.write(f"\n +\n ... ({len(self._terms) - limit} more terms)\n")
+
+        file.write("\n")
+
     def __repr__(self):
         return str(self._diagrams)
 
     def __str__(self):
-        string = "\n"
-
-        string += "\n +\n".join(str(diagram) for diagram in self._diagrams)
+        string = io.StringIO()
+        self.write(string)
 
-        return string + "\n"
+        return string.getvalue()
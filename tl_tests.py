@@ -1,3 +1,17 @@
+from fractions import Fraction
+import io
+import os
+import tempfile
+from . import catalan
+from . import coefficients
+from . import involution
+from . import lazy
+from . import parallel
+from . import serialize
+from . import sparse
+from . import tables
+from .diagram import Diagram
+from .jones_wenzl import JW
 from .tl import TL
 
 
@@ -7,6 +21,34 @@ def test(n = 3):
     test_b(n)
     print("\n\n\n")
     test_c(n)
+    print("\n\n\n")
+    test_d(n)
+    print("\n\n\n")
+    test_e(n)
+    print("\n\n\n")
+    test_f(n)
+    print("\n\n\n")
+    test_g(n)
+    print("\n\n\n")
+    test_h(n)
+    print("\n\n\n")
+    test_i(n)
+    print("\n\n\n")
+    test_j(n)
+    print("\n\n\n")
+    test_k(n)
+    print("\n\n\n")
+    test_l(n)
+    print("\n\n\n")
+    test_m(n)
+    print("\n\n\n")
+    test_n(n)
+    print("\n\n\n")
+    test_o(n)
+    print("\n\n\n")
+    test_p(n)
+    print("\n\n\n")
+    test_q(n)
 
 
 def test_a(n = 4):
@@ -109,3 +151,659 @@ def test_c(n = 4):
                 assert a == b
             else:
                 continue
+
+
+def test_d(n = 4):
+    """
+    Diagrams of the same shape are merged:
+    U_i + U_i == 2 * U_i and U_i + (-1) * U_i == 0
+    """
+
+    print("""\
++
+| Running `test_d`:
+|
+|   U_i + U_i = 2 U_i,
+|   U_i - U_i = 0.
++
+
+""")
+
+    U = [TL.U(n, i) for i in range(n - 1)]
+
+    for i, u in enumerate(U):
+        a, b = u + u, 2 * u
+        print(f"U_{i} + U_{i}:")
+        print(a)
+        print(f"2 * U_{i}:")
+        print(b)
+        print()
+        assert a == b
+        assert not a == u
+        assert u + (-1) * u == 0
+        assert TL([u._diagrams[0], u._diagrams[0]]) == b
+
+
+def test_e(n = 4):
+    """
+    Compositions looked up in a (saved and loaded) structure constant table
+    agree with the ones running through the strings
+    """
+
+    print("""\
++
+| Running `test_e`:
+|
+|   (U_0 + ... + U_{n-2})^2 is the same with and without a table.
++
+
+""")
+
+    u = sum(TL.U(n, i) for i in range(n - 1))
+    a = u * u
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"tl_{n}.table")
+        tables.save(tables.build(n), path)
+        tables.register(tables.load(path))
+
+        try:
+            b = u * u
+        finally:
+            tables.unregister(n)
+
+    print("(U_0 + ... + U_{n-2})^2:")
+    print(b)
+    print()
+    assert a == b
+
+
+def test_f(n = 4):
+    """
+    For every loop value delta and coefficient mode:
+    U_i^2 == delta U_i
+    """
+
+    print("""\
++
+| Running `test_f`:
+|
+|   U_i^2 = delta U_i,
+|
+| where delta = 5/2, with exact and float coefficients
++
+
+""")
+
+    coefficients.set_loop_value(Fraction(5, 2))
+
+    try:
+        for mode in [coefficients.EXACT, coefficients.FLOAT]:
+            coefficients.set_mode(mode)
+
+            U = [TL.U(n, i) for i in range(n - 1)]
+
+            for i, u in enumerate(U):
+                a, b = u * u, coefficients.delta() * u
+                print(f"U_{i}^2 ({mode.key}):")
+                print(a)
+                print(f"{coefficients.delta()} * U_{i}:")
+                print(b)
+                print()
+                assert a == b
+    finally:
+        coefficients.set_mode(coefficients.EXACT)
+
+    # The integer mode can not represent the loop value, so it is not set
+    try:
+        coefficients.set_mode(coefficients.INTEGER)
+        assert False
+    except ValueError:
+        assert coefficients.get_mode() is coefficients.EXACT
+        assert coefficients.delta() == Fraction(5, 2)
+    finally:
+        coefficients.set_loop_value(-2)
+
+
+def test_g(n = 4):
+    """
+    Composing on a process pool gives the same products as composing serially
+    """
+
+    print("""\
++
+| Running `test_g`:
+|
+|   a * b (parallel) = a * b (serial),
+|
+| where a = sum_i U_i, b = id + sum_i i U_i
++
+
+""")
+
+    a = sum(TL.U(n, i) for i in range(n - 1))
+    b = TL.id(n) + sum(i * TL.U(n, i) for i in range(1, n - 1))
+    serial = a * b
+
+    threshold = parallel.get_threshold()
+
+    try:
+        parallel.set_workers(2)
+        parallel.set_threshold(0)
+
+        for mode in [coefficients.EXACT, coefficients.FLOAT]:
+            coefficients.set_mode(mode)
+            product = a * b
+            print(f"a * b ({mode.key}):")
+            print(product)
+            assert product == serial
+
+            # Nothing to distribute for a zero element
+            zero = a + (-1) * a
+            assert zero * a == 0 and a * zero == 0
+
+        try:
+            parallel.set_threshold(-5)
+            assert False
+        except ValueError:
+            assert parallel.get_threshold() == 0
+    finally:
+        parallel.set_workers(0)
+        parallel.set_threshold(threshold)
+        coefficients.set_mode(coefficients.EXACT)
+
+
+def test_h(n = 4):
+    """
+    Elements written in the binary format are read back unchanged, also when
+    the file is mapped and iterated lazily
+    """
+
+    print("""\
++
+| Running `test_h`:
+|
+|   load(save(a)) = a, for exact, float and modular coefficients
+|
+| where a = id - 3/7 U_0 + 2^70 U_1 + ..., whatever the current mode is
++
+
+""")
+
+    a = TL.id(n) + Fraction(-3, 7) * TL.U(n, 0) + sum((2 ** 70 + i) * TL.U(n, i) for i in range(1, n - 1))
+
+    assert serialize.loads(serialize.dumps(a)) == a
+
+    # The ranks of the biggest n still fit into 64 bits
+    big = TL.U(serialize.MAX_N, 0) + TL.id(serialize.MAX_N)
+    assert serialize.loads(serialize.dumps(big)) == big
+
+    try:
+        serialize.dumps(TL.U(serialize.MAX_N + 1, 0))
+        assert False
+    except ValueError as error:
+        print(error)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "a.tl")
+
+            for mode in [coefficients.EXACT, coefficients.FLOAT]:
+                coefficients.set_mode(mode)
+                b = 1.0 * a if mode is coefficients.FLOAT else a
+
+                serialize.save(b, path, b"a")
+                print(f"{mode.key}: {os.path.getsize(path)} bytes")
+
+                assert serialize.load(path) == b
+
+                with serialize.map_file(path) as element:
+                    assert element.key == b"a" and len(element) == len(b._terms)
+                    assert dict(element) == dict(b._terms.items())
+
+            # The format follows the coefficients, not the mode
+            coefficients.set_mode(coefficients.EXACT)
+            assert serialize.loads(serialize.dumps(1.0 * a)) == 1.0 * a
+
+            mod = coefficients.Modular(1000003)
+            coefficients.set_mode(mod)
+            c = mod.convert(1) * a
+            serialize.save(c, path)
+
+            assert serialize.load(path) == c
+
+            for mode in [coefficients.EXACT, coefficients.Modular(7)]:
+                coefficients.set_mode(mode)
+
+                try:
+                    serialize.load(path)
+                    assert False
+                except ValueError as error:
+                    print(error)
+    finally:
+        coefficients.set_mode(coefficients.EXACT)
+
+
+def test_i(n = 4):
+    """
+    Writing an element term by term gives its string, and limits and
+    summaries cut it short
+    """
+
+    print("""\
++
+| Running `test_i`:
+|
+|   write(a) = str(a), write(a, limit=2, by_magnitude=True) has the 2 biggest terms
+|
+| where a = id + 2 U_0 + 3 U_1 + ...
++
+
+""")
+
+    a = TL.id(n) + sum((i + 2) * TL.U(n, i) for i in range(n - 1))
+
+    file = io.StringIO()
+    a.write(file)
+    assert file.getvalue() == str(a)
+
+    file = io.StringIO()
+    a.write(file, limit=2, by_magnitude=True)
+    print(file.getvalue())
+    assert [line.split(" *")[0] for line in file.getvalue().split("\n") if " *" in line] == [str(n), str(n - 1)]
+    assert f"({n - 2} more terms)" in file.getvalue()
+
+    file = io.StringIO()
+    a.write(file, summary=True)
+    print(file.getvalue())
+    assert file.getvalue() == f"TL_{n}: {n} terms, coefficients of magnitude 1 to {n}\n"
+
+    # Unboxed coefficients are streamed as well, without copying all terms
+    try:
+        coefficients.set_mode(coefficients.FLOAT)
+        b = 1.0 * a
+
+        assert not isinstance(b._terms.items(), list)
+        assert b.summary() == f"TL_{n}: {n} terms, coefficients of magnitude 1.0 to {float(n)}"
+
+        file = io.StringIO()
+        b.write(file, limit=1, by_magnitude=True)
+        assert [line.split(" *")[0] for line in file.getvalue().split("\n") if " *" in line] == [str(float(n))]
+    finally:
+        coefficients.set_mode(coefficients.EXACT)
+
+
+def test_j(n = 4):
+    """
+    Lazy expressions evaluate to the same elements as eager arithmetic, and
+    chains of products are multiplied in the cheapest order
+    """
+
+    print("""\
++
+| Running `test_j`:
+|
+|   lazy(a + 3/2 a * u * a + b & id_1) = a + 3/2 a * u * a + b & id_1
+|
+| where a = id + sum_i U_i, u = U_0, b = id_{n-1} - U_0
++
+
+""")
+
+    a = TL.id(n) + sum(TL.U(n, i) for i in range(n - 1))
+    u = TL.U(n, 0)
+    b = TL.id(n - 1) + (-1) * TL.U(n - 1, 0)
+
+    eager = a + Fraction(3, 2) * a * u * a + (b & TL.id(1))
+
+    x = lazy.lift(a)
+    expression = x + Fraction(3, 2) * x * u * x + (lazy.lift(b) & TL.id(1))
+    print(expression.evaluate())
+
+    assert expression.evaluate() == eager
+
+    # (1000 terms) * ((1000 terms) * (1 term)) is cheaper
+    work, terms, split = lazy._chain_orders([1000, 1000, 1], 10 ** 6)[0, 2]
+    assert split == 0 and work == 1000 + 1000 * 1000
+
+
+def test_k(n = 4):
+    """
+    Accumulating in place gives the same sums as adding, and drops cancelled
+    terms right away
+    """
+
+    print("""\
++
+| Running `test_k`:
+|
+|   a.axpy(c, b), TL.sum([a_1, ..., a_k]) = sum([a_1, ..., a_k])
+|   a += b leaves the element a was bound to (e.g. JW_n) unchanged
++
+
+""")
+
+    elements = [TL.id(n) + (i + 1) * TL.U(n, i) for i in range(n - 1)]
+
+    total = TL.sum(elements)
+    print(total)
+    assert total == sum(elements)
+
+    a = elements[0].copy()
+    a.axpy(1, elements[1])
+    assert a == elements[0] + elements[1]
+    assert not a == elements[0]
+
+    # `+=` binds a new element, so shared elements stay as they are
+    jw = JW.get(n)
+    b = jw
+    b += TL.U(n, 0)
+    assert b is not jw and JW.get(n) is jw
+    assert all(JW.get(n) * TL.U(n, i) == 0 for i in range(n - 1))
+
+    before = elements[0].copy()
+    s = sum([elements[0]])
+    s += elements[1]
+    assert elements[0] == before and s == before + elements[1]
+
+    # Cancel a completely
+    a.axpy(-1, elements[0]).axpy(-1, elements[1])
+    assert a == 0 and not a._terms
+
+    assert TL.sum(elements, [2, -1] + [0] * (n - 3)) == 2 * elements[0] + (-1) * elements[1]
+
+    try:
+        TL.sum(elements, [2])
+        assert False
+    except ValueError:
+        pass
+
+    # Accumulating an element into itself, in every coefficient mode
+    try:
+        for mode in [coefficients.EXACT, coefficients.FLOAT, coefficients.Modular(7)]:
+            coefficients.set_mode(mode)
+
+            b = TL.id(n) + 3 * TL.U(n, 0)
+            assert b.copy().axpy(1, b.copy()) == b.axpy(1, b) == 2 * (TL.id(n) + 3 * TL.U(n, 0))
+            assert b.axpy(-1, b) == 0 and not b._terms
+    finally:
+        coefficients.set_mode(coefficients.EXACT)
+
+
+def test_l(n = 4):
+    """
+    Multiplying by generators by rewiring two strings gives the same products
+    as stacking the diagrams
+    """
+
+    print("""\
++
+| Running `test_l`:
+|
+|   U_i * a = a.left_mul_U(i), a * U_i = a.right_mul_U(i)
+|
+| where a = id + 2 U_0 + 3 U_1 + ... + U_0 * U_1 * ...
++
+
+""")
+
+    a = TL.id(n) + sum((i + 2) * TL.U(n, i) for i in range(n - 1))
+    chain = TL.U(n, 0)
+
+    for i in range(1, n - 1):
+        chain = chain * TL.U(n, i)
+
+    a = a + chain
+
+    def stacked(top, bottom):
+        # Compose diagram by diagram, avoiding all fast paths
+        return TL([d * e for d in top._diagrams for e in bottom._diagrams]).condense_diagrams()
+
+    lefts = TL.left_mul_U_batch([a, chain], 0)
+    rights = TL.right_mul_U_batch([a, chain], n - 2)
+
+    for i in range(n - 1):
+        u = TL.U(n, i)
+        print(f"a * U_{i}:")
+        print(a.right_mul_U(i))
+        assert a.left_mul_U(i) == stacked(u, a) == u * a
+        assert a.right_mul_U(i) == stacked(a, u) == a * u
+        assert a * (3 * u) == 3 * stacked(a, u)
+
+    assert lefts == [stacked(TL.U(n, 0), a), stacked(TL.U(n, 0), chain)]
+    assert rights == [stacked(a, TL.U(n, n - 2)), stacked(chain, TL.U(n, n - 2))]
+
+
+def test_m(n = 4):
+    """
+    Composing a whole stack in a single pass gives the same products as
+    composing it one by one
+    """
+
+    print("""\
++
+| Running `test_m`:
+|
+|   compose_chain([a_1, ..., a_k]) = a_1 * ... * a_k
+|
+| for stacks of basis diagrams, generators and the element a of `test_l`
++
+
+""")
+
+    basis = list(catalan.basis(n))
+    diagrams = basis + basis[::-1] + [Fraction(1, 2) * d for d in basis[::3]]
+    product = diagrams[0]
+
+    for d in diagrams[1:]:
+        product = product * d
+
+    print(Diagram.compose_chain(diagrams))
+
+    assert Diagram.compose_chain(diagrams) == product
+    assert Diagram.compose_chain(basis[:1]) == basis[0]
+
+    a = TL.id(n) + sum((i + 2) * TL.U(n, i) for i in range(n - 1))
+    us = [TL.U(n, i % (n - 1)) for i in range(3 * n)]
+
+    for elements in [us, us + [a] + us + [3 * TL.U(n, 0)], [a, a] + us[:2], [TL([d]) for d in diagrams]]:
+        product = elements[0]
+
+        for element in elements[1:]:
+            product = product * element
+
+        assert TL.compose_chain(elements) == product
+
+
+def test_n(n = 4):
+    """
+    Closing strands on the partner arrays satisfies the defining identities
+    of the Markov trace
+    """
+
+    print("""\
++
+| Running `test_n`:
+|
+|   tr(a * b) = tr(b * a), tr(ptr_k(a)) = tr(a), tr(id) = delta^n
+|   ptr_1((c & id_1) * U_(n-2) * (d & id_1)) = c * d
+|   ptr_1(c & id_1) = delta c
+|
+| for a = id + 2 U_0 + 3 U_1 + ..., b = U_0 * U_1 * ... and the basis
+| diagrams c, d of TL_(n-1)
++
+
+""")
+
+    a = TL.id(n) + sum((i + 2) * TL.U(n, i) for i in range(n - 1))
+    b = TL.compose_chain([TL.U(n, i) for i in range(n - 1)])
+
+    print(f"tr(a * b) = {(a * b).trace()}")
+
+    assert (a * b).trace() == (b * a).trace()
+    assert all(a.partial_trace(k).trace() == a.trace() for k in range(n))
+    assert TL.id(n).trace() == coefficients.delta() ** n
+
+    basis = list(catalan.basis(n - 1))
+    u = Diagram.U(n, n - 2)
+
+    for c in basis:
+        assert (c & Diagram.id(1)).partial_trace(1) == coefficients.delta() * c
+        assert TL([c]).trace() == c.trace()
+
+        for d in basis:
+            e = Diagram.compose_chain([c & Diagram.id(1), u, d & Diagram.id(1)])
+
+            assert e.partial_trace(1) == c * d
+
+
+def test_o(n = 4):
+    """
+    Adding strands by offsetting the partner arrays gives the same elements as
+    tensoring diagram by diagram, in every coefficient mode
+    """
+
+    print("""\
++
+| Running `test_o`:
+|
+|   a.extend(k) = a & id_k
+|
+| for a = id + 2 U_0 + 3 U_1 + ... + U_0 * U_1 * ... and k = 0, 1, 2
++
+
+""")
+
+    def tensored(left, right):
+        # Tensor diagram by diagram, avoiding all fast paths
+        return TL([d & e for d in left._diagrams for e in right._diagrams])
+
+    try:
+        for mode in [coefficients.EXACT, coefficients.FLOAT, coefficients.Modular(7)]:
+            coefficients.set_mode(mode)
+
+            a = TL.id(n) + sum((i + 2) * TL.U(n, i) for i in range(n - 1))
+            a = a + TL.compose_chain([TL.U(n, i) for i in range(n - 1)])
+
+            for k in range(1, 3):
+                assert a.extend(k) == tensored(a, TL.id(k)) == a & TL.id(k)
+                assert a.extend(k).n == n + k
+
+            assert a.extend(0) == a
+            assert a.extend(1).extend(1) == a.add_through_strands(2)
+
+        print(a.extend(1))
+    finally:
+        coefficients.set_mode(coefficients.EXACT)
+
+
+def test_p(n = 4):
+    """
+    Compositions by the sparse backend agree with the pure Python ones (only
+    if NumPy is installed)
+    """
+
+    print("""\
++
+| Running `test_p`:
+|
+|   a * b is the same with and without the sparse backend,
+|
+| for a = id + 2 U_0 + 3 U_1 + ..., b = U_0 * U_1 * ... and 0, with exact
+| and float coefficients
++
+
+""")
+
+    if not sparse.available():
+        print("Skipped: NumPy is not installed")
+
+        return
+
+    tables.register(tables.build(n))
+
+    try:
+        for mode in [coefficients.EXACT, coefficients.FLOAT]:
+            coefficients.set_mode(mode)
+
+            a = TL.id(n) + sum((i + 2) * TL.U(n, i) for i in range(n - 1))
+            b = Fraction(1, 3) * TL.compose_chain([TL.U(n, i) for i in range(n - 1)]) + TL.id(n)
+            zero = a + (-1) * a
+
+            pairs = [(a, b), (b, a), (a, a), (a, zero), (zero, b)]
+
+            sparse.set_enabled(False)
+            expected = [x * y for x, y in pairs]
+
+            sparse.set_enabled(True)
+            assert sparse.enabled()
+            products = [x * y for x, y in pairs]
+
+            print(f"a * b ({mode.key}):")
+            print(products[0])
+
+            assert products == expected
+            assert products[3] == 0 and products[4] == 0
+    finally:
+        sparse.set_enabled(False)
+        tables.unregister(n)
+        coefficients.set_mode(coefficients.EXACT)
+
+
+def test_q(n = 4):
+    """
+    Elements with Dyck shapes agree with the ones with partner shapes
+    """
+
+    print("""\
++
+| Running `test_q`:
+|
+|   JW_n, a * b, a & b, a.partial_trace(1), a.trace(), a.extend() and the
+|   diagrams of words are the same with Dyck shapes as with partner shapes,
+|
+| for a = JW_n + U_0, b = U_0 * U_1 * ... + 2 id
++
+
+""")
+
+    def build():
+        a = JW.get(n) + TL.U(n, 0)
+        b = TL.compose_chain([TL.U(n, i) for i in range(n - 1)]) + 2 * TL.id(n)
+
+        return [JW.get(n), a * b, b * a, a & b, a.partial_trace(1), a.extend(), Diagram.from_word(n, range(n - 1))]
+
+    def partner_terms(tl):
+        return {involution.from_shape(shape).tobytes(): c for shape, c in tl.condense_diagrams()._terms.items()}
+
+    expected = build()
+    traces = [tl.trace() for tl in expected[:-1]]
+
+    try:
+        involution.set_shape_encoding(involution.DYCK_SHAPES)
+        elements = build()
+
+        assert all(isinstance(shape, int) for shape in elements[0]._terms)
+        assert [tl.trace() for tl in elements[:-1]] == traces
+    finally:
+        involution.set_shape_encoding(involution.PARTNER_SHAPES)
+
+    print(f"JW_{n} with Dyck shapes:")
+    print(elements[0])
+
+    for tl, expectation in zip(elements[:-1], expected[:-1]):
+        assert tl.n == expectation.n
+        assert partner_terms(tl) == partner_terms(expectation)
+
+    assert elements[-1]._connections == expected[-1]._connections
+    assert elements[-1]._coefficient == expected[-1]._coefficient
+
+    # Back to partner shapes
+    assert all(isinstance(shape, bytes) for shape in JW.get(n)._terms)
+
+    try:
+        involution.set_shape_encoding(5)
+    except ValueError:
+        pass
+    else:
+        assert False
@@ -0,0 +1,241 @@
+"""
+This module converts between words in the generators U_i and basis diagrams.
+
+The word (i_1, ..., i_k) stands for the product U_{i_1} * ... * U_{i_k}
+(with the generators 0 indexed, as in `Diagram.U`).
+Its diagram is built in a single pass over the word: starting from the
+identity, every letter rewires two bottom vertices of a partner array (see
+`involution.right_mul_U`) and possibly closes a loop.
+
+The way back gives the Jones normal form, i.e. the unique reduced word
+
+    (U_{a_1} U_{a_1 - 1} ... U_{b_1}) ... (U_{a_m} U_{a_m - 1} ... U_{b_m})
+
+with a_j >= b_j, a_1 < ... < a_m and b_1 < ... < b_m.
+It is also the lexicographically smallest reduced word of the diagram, so it
+is read off greedily: the first letter is the leftmost cap (i, i + 1) at the
+top, and the diagram with this letter peeled off is found by uncrossing the
+cap and the first string crossing the line between the columns i and i + 1.
+This takes O(n) per letter, e.g.
+
+    >>> words.reduced_word(Diagram.U(4, 1).compose(Diagram.U(4, 0)).shape())
+    (1, 0)
+
+Both directions are remembered in bounded caches.
+"""
+
+from array import array
+from collections import OrderedDict
+from . import involution
+
+# The default number of remembered words and shapes
+MAXSIZE = 1 << 14
+
+
+def _identity(n):
+    last = 2 * n - 1
+
+    return array(involution.TYPECODE, [last - k for k in range(2 * n)])
+
+
+def _from_word(n, word):
+    # Some idiot testing
+    if not isinstance(n, int) or n < 1:
+        raise ValueError(f"`n` must be a positive integer: {n}")
+
+    partners = _identity(n)
+    last = 2 * n - 1
+    loops = 0
+
+    for i in word:
+        if not isinstance(i, int) or not 0 <= i < n - 1:
+            raise ValueError(f"The letters of `word` must be integers i with 0 <= i < `n`-1 for U_i to exist in TL_n: {word}, {n}")
+
+        # Cap the bottom vertices below the columns i and i + 1
+        a, b = last - i - 1, last - i
+        x, y = partners[a], partners[b]
+
+        if x == b:
+            loops += 1
+            continue
+
+        partners[x] = y
+        partners[y] = x
+        partners[a] = b
+        partners[b] = a
+
+    return involution.to_shape(partners), loops
+
+
+def _reduced_word(shape):
+    partners = involution.from_shape(shape)
+    n = len(partners) // 2
+    last = 2 * n - 1
+    word = []
+
+    # The leftmost cap at the top can only move to the right
+    i = 0
+
+    while True:
+        while i < n - 1 and not partners[i] == i + 1:
+            i += 1
+
+        # Only the identity has no cap at the top
+        if i == n - 1:
+            return tuple(word)
+
+        word.append(i)
+
+        # The strings right of the line between the columns i and i + 1 end
+        # in the top vertices i + 1, ..., n - 1 and the bottom vertices
+        # n, ..., last - i - 1
+        for k in list(range(i - 1, -1, -1)) + list(range(last, last - i - 1, -1)):
+            y = partners[k]
+
+            if i < y < last - i:
+                break
+
+        # Uncross the cap (i, i + 1) and the string (k, y)
+        partners[i] = k
+        partners[k] = i
+        partners[i + 1] = y
+        partners[y] = i + 1
+
+        # A new cap can only start left of the old one
+        i = max(i - 1, 0)
+
+
+class WordCache:
+    """
+    Least recently used caches of the diagrams of words and of the reduced
+    words of diagrams.
+
+    `maxsize: int`
+            The maximal number of entries in each cache.
+            A cache with `maxsize == 0` remembers nothing.
+
+    `hits: int`, `misses: int`
+            How often a word or shape was (not) found.
+
+    `_words: OrderedDict`
+            Maps (shape encoding, n, word) to (shape, loops), the least recently used first.
+
+    `_reduced: OrderedDict`
+            Maps shapes to reduced words, the least recently used first.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+    _words: OrderedDict
+    _reduced: OrderedDict
+
+    def __init__(self, maxsize=MAXSIZE):
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError(f"`maxsize` must be a non-negative integer: {maxsize}")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._words = OrderedDict()
+        self._reduced = OrderedDict()
+
+    def _lookup(self, entries, key, calculate):
+        entry = entries.get(key)
+
+        if entry is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+
+            return entry
+
+        self.misses += 1
+        entry = calculate()
+
+        if self.maxsize:
+            entries[key] = entry
+
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+        return entry
+
+    def from_word(self, n, word):
+        """
+        Like `words.from_word`, but remembered.
+        """
+
+        word = tuple(word)
+
+        return self._lookup(self._words, (involution.get_shape_encoding(), n, word), lambda: _from_word(n, word))
+
+    def reduced_word(self, shape):
+        """
+        Like `words.reduced_word`, but remembered.
+        """
+
+        return self._lookup(self._reduced, shape, lambda: _reduced_word(shape))
+
+    def resize(self, maxsize):
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError(f"`maxsize` must be a non-negative integer: {maxsize}")
+
+        self.maxsize = maxsize
+
+        for entries in (self._words, self._reduced):
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+
+    def clear(self):
+        self._words.clear()
+        self._reduced.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._words) + len(self._reduced),
+            "maxsize": self.maxsize
+        }
+
+
+# The cache used by `Diagram.from_word` and `Diagram.to_reduced_word`
+_cache = WordCache()
+
+
+def from_word(n, word):
+    """
+    The shape of the product of the generators U_i of TL_n for the letters i
+    of `word`, and the number of closed loops.
+
+    Raises a `ValueError` if a letter is no generator of TL_n.
+    """
+
+    return _cache.from_word(n, word)
+
+
+def reduced_word(shape):
+    """
+    The Jones normal form of the diagram with the shape `shape`, as a tuple
+    of letters.
+    """
+
+    return _cache.reduced_word(shape)
+
+
+def set_maxsize(maxsize):
+    """
+    Bound the number of remembered words and shapes (0 turns the caches off).
+    """
+
+    _cache.resize(maxsize)
+
+
+def stats():
+    return _cache.stats()
+
+
+def clear():
+    _cache.clear()